@@ -1,4 +1,7 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from modules.perf import perf
 
 # Config
 st.set_page_config(
@@ -7,21 +10,38 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# Keep the archive cache of saved grid configs warm in the background.
+# start() is idempotent, so the worker runs once per server process.
+from modules.prewarm import cache_prewarmer
+cache_prewarmer.start()
+
+# Attribute the timings of this run (and of the requests it sends) to the browser session
+ctx = get_script_run_ctx()
+perf.set_session(ctx.session_id if ctx is not None else None)
+
 # Set the title of the app
 st.title("Weather Forecast App")
 
 # Get the menu selection from url
 menu = st.sidebar.radio(
     "Menu",
-    ["Forecast", "Map - Plotly", "Map - Plot"],
+    ["Forecast", "Map - Plotly", "Map - Plot", "Map - Grid"],
 )
 
-if menu == "Forecast":
-    from pages.forecast import render
-    render()
-elif menu == "Map - Plotly":
-    from pages.map import render
-    render()
-elif menu == "Map - Plot":
-    from pages.map_old import render
-    render()
\ No newline at end of file
+with perf.span("page.run", page=menu):
+    if menu == "Forecast":
+        from pages.forecast import render
+        render()
+    elif menu == "Map - Plotly":
+        from pages.map import render
+        render()
+    elif menu == "Map - Plot":
+        from pages.map_old import render
+        render()
+    elif menu == "Map - Grid":
+        from pages.map_grid import render
+        render()
+
+# Optional sidebar panel, after the page so its timings include this run
+from modules.perf_panel import render as render_perf_panel
+render_perf_panel()
@@ -0,0 +1,44 @@
+"""Synthetic ERA5-like NetCDF files (t2m, u10, v10 on valid_time x latitude x longitude)."""
+import os
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from modules.dataset import DATASET_PATH, DEFAULT_BBOX
+
+def make_dataset(num_times=24, resolution=0.25, bbox=DEFAULT_BBOX, start="2024-01-01", seed=0):
+    """
+    Smooth, time-varying fields covering bbox at the given resolution. Latitude is
+    descending like the real ERA5 files, so the bbox selection code paths are exercised.
+    """
+    lon_min, lat_min, lon_max, lat_max = bbox
+    lat = np.arange(lat_max, lat_min - resolution / 2, -resolution)
+    lon = np.arange(lon_min, lon_max + resolution / 2, resolution)
+    times = pd.date_range(start, periods=num_times, freq="h")
+    rng = np.random.default_rng(seed)
+
+    t = np.arange(num_times, dtype=np.float32)[:, None, None]
+    y = np.deg2rad(lat, dtype=np.float32)[None, :, None]
+    x = np.deg2rad(lon, dtype=np.float32)[None, None, :]
+    shape = (num_times, len(lat), len(lon))
+    noise = lambda scale: rng.normal(0, scale, shape).astype(np.float32)
+    t2m = 300 - 30 * np.sin(y) ** 2 + 5 * np.sin(3 * x + t / 6) + noise(0.5)
+    u10 = 6 * np.cos(2 * y + t / 8) + noise(0.5)
+    v10 = 4 * np.sin(2 * x - t / 10) + noise(0.5)
+    dims = ("valid_time", "latitude", "longitude")
+    return xr.Dataset(
+        {
+            "t2m": (dims, t2m.astype(np.float32), {"units": "K"}),
+            "u10": (dims, u10.astype(np.float32), {"units": "m s**-1"}),
+            "v10": (dims, v10.astype(np.float32), {"units": "m s**-1"}),
+        },
+        coords={"valid_time": times, "latitude": lat, "longitude": lon},
+    )
+
+def write_dataset(directory, num_times=24, resolution=0.25, **kwargs):
+    """Write a fixture where the map pages look for it (./dataset relative to directory)."""
+    path = os.path.join(directory, DATASET_PATH)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    make_dataset(num_times, resolution, **kwargs).to_netcdf(path)
+    return path
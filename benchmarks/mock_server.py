@@ -0,0 +1,155 @@
+"""
+Local stand-in for the Open-Meteo forecast and ERA5 archive endpoints, with
+configurable latency and error rate. Answers are synthetic but shaped like the real
+API (multi-location requests return a list).
+
+    python -m benchmarks.mock_server --port 8765 --latency 0.05 --error-rate 0.02
+    OPEN_METEO_ARCHIVE_URL=http://127.0.0.1:8765/v1/era5 \
+    OPEN_METEO_FORECAST_URL=http://127.0.0.1:8765/v1/forecast streamlit run app.py
+"""
+import argparse
+import asyncio
+import datetime
+import random
+import threading
+from collections import Counter
+
+import numpy as np
+from aiohttp import web
+
+def hourly_times(start, hours):
+    first = datetime.datetime.combine(start, datetime.time())
+    return [(first + datetime.timedelta(hours=h)).strftime("%Y-%m-%dT%H:%M") for h in range(hours)]
+
+def hourly_block(lat, lon, times):
+    hours = np.arange(len(times))
+    return {
+        "time": times,
+        "temperature_2m": np.round(25 + 3 * np.sin(lat / 2) + 2 * np.cos(lon / 3) + 4 * np.sin(hours / 24 * 2 * np.pi), 1).tolist(),
+        "windspeed_10m": np.round(8 + 3 * np.cos(lat + hours / 12), 1).tolist(),
+        "winddirection_10m": np.round((lon * 10 + hours * 5) % 360).tolist(),
+    }
+
+def archive_payload(lat, lon, start_date, end_date):
+    start = datetime.date.fromisoformat(start_date)
+    days = (datetime.date.fromisoformat(end_date) - start).days + 1
+    dates = [(start + datetime.timedelta(days=d)).isoformat() for d in range(days)]
+    return {
+        "latitude": lat, "longitude": lon,
+        "hourly_units": {"temperature_2m": "°C", "windspeed_10m": "km/h", "winddirection_10m": "°"},
+        "hourly": hourly_block(lat, lon, hourly_times(start, days * 24)),
+        "daily": {"time": dates, "rain_sum": [0.0] * days},
+    }
+
+def forecast_payload(lat, lon, days=7):
+    start = datetime.date.today()
+    dates = [(start + datetime.timedelta(days=d)).isoformat() for d in range(days)]
+    hourly = hourly_block(lat, lon, hourly_times(start, days * 24))
+    temperature = np.reshape(hourly["temperature_2m"], (days, 24))
+    return {
+        "latitude": lat, "longitude": lon,
+        "hourly": hourly,
+        "daily": {
+            "time": dates,
+            "temperature_2m_max": temperature.max(axis=1).tolist(),
+            "temperature_2m_min": temperature.min(axis=1).tolist(),
+            "windspeed_10m_max": np.reshape(hourly["windspeed_10m"], (days, 24)).max(axis=1).tolist(),
+        },
+    }
+
+class MockOpenMeteo:
+    """
+    aiohttp server on its own event loop thread. Every request waits `latency` seconds
+    (plus up to `jitter`) and fails with a 503 with probability `error_rate`.
+    Request and error counts are kept in `stats`.
+    """
+    def __init__(self, latency=0.05, error_rate=0.0, jitter=0.0, host="127.0.0.1", port=0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.jitter = jitter
+        self.host = host
+        self.port = port
+        self.stats = Counter()
+        self._random = random.Random(seed)
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+    @property
+    def forecast_url(self):
+        return f"http://{self.host}:{self.port}/v1/forecast"
+
+    @property
+    def archive_url(self):
+        return f"http://{self.host}:{self.port}/v1/era5"
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/v1/forecast", self._forecast)
+        app.router.add_get("/v1/era5", self._archive)
+        return app
+
+    async def _respond(self, request, payload):
+        self.stats["requests"] += 1
+        await asyncio.sleep(self.latency + self._random.random() * self.jitter)
+        if self._random.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return web.json_response({"error": True, "reason": "mock failure"}, status=503)
+        query = request.query
+        lats = [float(v) for v in query["latitude"].split(",")]
+        lons = [float(v) for v in query["longitude"].split(",")]
+        self.stats["locations"] += len(lats)
+        results = [payload(lat, lon, query) for lat, lon in zip(lats, lons)]
+        return web.json_response(results if len(results) > 1 else results[0])
+
+    async def _forecast(self, request):
+        return await self._respond(request, lambda lat, lon, query: forecast_payload(lat, lon))
+
+    async def _archive(self, request):
+        return await self._respond(
+            request, lambda lat, lon, query: archive_payload(lat, lon, query["start_date"], query["end_date"])
+        )
+
+    def start(self):
+        """Serve in a background thread; returns once the port is bound."""
+        ready = threading.Event()
+
+        async def serve():
+            self._runner = web.AppRunner(self.app())
+            await self._runner.setup()
+            site = web.TCPSite(self._runner, self.host, self.port)
+            await site.start()
+            self.port = site._server.sockets[0].getsockname()[1]
+            ready.set()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(serve())
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="mock-open-meteo", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mock Open-Meteo forecast and ERA5 archive server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a 503")
+    args = parser.parse_args(argv)
+    server = MockOpenMeteo(args.latency, args.error_rate, args.jitter, args.host, args.port)
+    web.run_app(server.app(), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
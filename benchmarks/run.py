@@ -0,0 +1,237 @@
+"""
+Benchmark scenarios for the hot paths: archive grid fetch, cache load/save, Plotly
+figure build and GIF/frame rendering. Everything runs against the local mock server
+and synthetic NetCDF fixtures in a scratch directory, never the real API.
+
+    python -m benchmarks.run                      # every scenario
+    python -m benchmarks.run --quick --only fetch cache
+    python -m benchmarks.run --compare benchmarks/results/<earlier run>.json
+
+Results are written as JSON (one record per scenario and parameter set) to
+benchmarks/results/, named after the time and the git commit.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.mock_server import MockOpenMeteo, archive_payload
+
+SCENARIOS = ("fetch", "cache", "plotly", "gif")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+def timed(fn, repeat=1):
+    """(median seconds, last result) over `repeat` runs of fn()."""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations), result
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(__file__), check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                                    text=True, cwd=os.path.dirname(__file__)).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+def bench_fetch(server, workdir, quick=False, grid_sizes=None):
+    """Cold (every cell downloaded) and warm (every cell cached) grid fetch."""
+    from modules.archive import fetch_archive_cells
+    from modules.cache import CacheManager
+    from modules.fetch import FetchEngine
+    from modules.grid import ERA5_RESOLUTION, grid_points_array, snap_grid
+
+    for num_points in grid_sizes or ((5, 10) if quick else (5, 10, 20, 30)):
+        # Spacing a bit wider than the model grid, so every point is its own cell
+        radius_km = (num_points - 1) * ERA5_RESOLUTION * 1.2 / 2 * 111
+        cells = snap_grid(grid_points_array(16.0, 106.0, radius_km, num_points)).cell_keys()
+        cache = CacheManager(cache_dir=tempfile.mkdtemp(dir=workdir), backend="sqlite")
+        engine = FetchEngine()
+        errors = []
+        before = dict(server.stats)
+        cold, data = timed(lambda: fetch_archive_cells(cells, engine=engine, cache=cache,
+                                                       on_error=lambda cell, message: errors.append(cell)))
+        requests = server.stats["requests"] - before.get("requests", 0)
+        mock_errors = server.stats["errors"] - before.get("errors", 0)
+        warm, _ = timed(lambda: fetch_archive_cells(cells, engine=engine, cache=cache), repeat=3)
+        engine.close()
+        yield {"num_points": num_points, "cells": len(cells)}, {
+            "cold_seconds": cold,
+            "warm_seconds": warm,
+            "cold_cells_per_second": len(cells) / cold,
+            "requests": requests,
+            "mock_errors": mock_errors,
+            "failed_cells": len(errors),
+            "fetched_cells": len(data),
+        }
+
+def bench_cache(server, workdir, quick=False):
+    """Save and load latency of both disk backends, memory tier hits and bulk loads."""
+    from modules.cache import CacheManager
+
+    num_entries = 100 if quick else 500
+    payload = archive_payload(16.0, 106.0, "2024-01-01", "2024-01-07")
+    keys = [(16.0 + i * 0.25, 106.0) for i in range(num_entries)]
+    for backend in ("json", "sqlite"):
+        cache_dir = tempfile.mkdtemp(dir=workdir)
+        cache = CacheManager(cache_dir=cache_dir, backend=backend)
+        save, _ = timed(lambda: [cache.save(payload, "archive", *key) for key in keys])
+        memory, _ = timed(lambda: [cache.load("archive", *key) for key in keys], repeat=3)
+        # A new manager has an empty memory tier: every load goes to disk
+        cold = CacheManager(cache_dir=cache_dir, backend=backend)
+        disk, _ = timed(lambda: [cold.load("archive", *key) for key in keys])
+        bulk_cache = CacheManager(cache_dir=cache_dir, backend=backend)
+        bulk, _ = timed(lambda: bulk_cache.load_entry_many("archive", keys))
+        yield {"backend": backend, "entries": num_entries}, {
+            "save_ms_per_entry": save / num_entries * 1000,
+            "memory_hit_us_per_entry": memory / num_entries * 1e6,
+            "disk_load_ms_per_entry": disk / num_entries * 1000,
+            "bulk_load_ms_per_entry": bulk / num_entries * 1000,
+        }
+
+def bench_plotly(server, workdir, quick=False):
+    """Static and animated Plotly figure build time across dataset resolutions."""
+    from benchmarks.fixtures import write_dataset
+    from modules.dataset import open_data
+    from modules.derived import DerivedFields
+    from modules.lod import LodPyramid, lod_level
+    from pages.map import FIGURE_SIZE, create_animated_figure, create_plotly_figure
+
+    for resolution in ((0.5, 0.25) if quick else (0.5, 0.25, 0.1)):
+        num_times = 12 if quick else 24
+        path = write_dataset(tempfile.mkdtemp(dir=workdir), num_times=num_times, resolution=resolution)
+        data = open_data([path])
+        derived = DerivedFields(data)
+        lat, lon = data.latitude, data.longitude
+        pyramid = LodPyramid(derived, lat.values, lon.values)
+        level = lod_level((lat.size, lon.size), FIGURE_SIZE, FIGURE_SIZE)
+        zrange = derived.zrange("Temperature")
+        first, _ = timed(lambda: create_plotly_figure("Temperature", lat, lon, derived, 0, zrange=zrange))
+        static, _ = timed(lambda: create_plotly_figure("Temperature", lat, lon, derived, 1, zrange=zrange), repeat=5)
+        static_lod, _ = timed(lambda: create_plotly_figure("Temperature", lat, lon, derived, 1, zrange=zrange,
+                                                           pyramid=pyramid, level=level), repeat=5)
+        animated, fig = timed(lambda: create_animated_figure("Temperature", lat, lon, derived,
+                                                             pyramid=pyramid, level=level))
+        yield {"resolution": resolution, "grid": [int(lat.size), int(lon.size)], "frames": num_times}, {
+            "first_figure_seconds": first,
+            "static_figure_seconds": static,
+            "static_lod_figure_seconds": static_lod,
+            "lod_level": level,
+            "animated_figure_seconds": animated,
+            "animated_json_bytes": len(fig.to_json()),
+        }
+
+def bench_gif(server, workdir, quick=False):
+    """
+    Per-frame cost of the GIF paths and the cached animation frames of Map - Plot,
+    amortized over the run: setup (figure, Basemap, coastline mask) is included, so
+    compare runs with the same frame count.
+    """
+    from benchmarks.fixtures import write_dataset
+    from modules.artifacts import artifact_cache
+    from modules.dataset import open_map_data
+    from modules.derived import DerivedFields
+    from modules.frames import MESH_STYLE, create_gif, frame_pngs, mesh_renderer
+
+    cwd = os.getcwd()
+    for num_times in ((6,) if quick else (6, 24)):
+        directory = tempfile.mkdtemp(dir=workdir)
+        write_dataset(directory, num_times=num_times)
+        # The map code reads ./dataset and writes ./.cache relative to the working directory
+        os.chdir(directory)
+        try:
+            data = open_map_data()
+            derived = DerivedFields(data)
+            metrics = {}
+            for name, fast in (("contour_gif", False), ("raster_gif", True)):
+                seconds, _ = timed(lambda: create_gif("Wind", data, derived, workers=1, fast=fast))
+                metrics[f"{name}_ms_per_frame"] = seconds / num_times * 1000
+            seconds, _ = timed(lambda: list(frame_pngs("Wind", num_times, MESH_STYLE,
+                                                       lambda: mesh_renderer("Wind", data, derived))))
+            metrics["mesh_frames_ms_per_frame"] = seconds / num_times * 1000
+            seconds, _ = timed(lambda: list(frame_pngs("Wind", num_times, MESH_STYLE,
+                                                       lambda: mesh_renderer("Wind", data, derived))))
+            metrics["cached_frames_ms_per_frame"] = seconds / num_times * 1000
+            artifact_cache.clear()
+        finally:
+            os.chdir(cwd)
+        yield {"frames": num_times, "grid": [int(data.latitude.size), int(data.longitude.size)]}, metrics
+
+def compare(results, baseline_path):
+    """Print the ratio of every metric to the same scenario and params of a baseline run."""
+    with open(baseline_path, 'r') as f:
+        baseline = {(r["scenario"], json.dumps(r["params"], sort_keys=True)): r["metrics"]
+                    for r in json.load(f)["results"]}
+    for record in results:
+        old = baseline.get((record["scenario"], json.dumps(record["params"], sort_keys=True)))
+        if old is None:
+            continue
+        for name, value in record["metrics"].items():
+            if isinstance(value, (int, float)) and isinstance(old.get(name), (int, float)) and old[name]:
+                print(f"{record['scenario']:7} {json.dumps(record['params']):45} {name:30} "
+                      f"{old[name]:12.4f} -> {value:12.4f}  x{value / old[name]:.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the performance benchmarks.")
+    parser.add_argument("--only", nargs="+", choices=SCENARIOS, help="Scenarios to run (default: all)")
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes, for a fast sanity run")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock server latency per request (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of mock requests failing with 503")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    args = parser.parse_args(argv)
+
+    server = MockOpenMeteo(latency=args.latency, error_rate=args.error_rate).start()
+    # Read by modules.archive and modules.helper at import time
+    os.environ["OPEN_METEO_ARCHIVE_URL"] = server.archive_url
+    os.environ["OPEN_METEO_FORECAST_URL"] = server.forecast_url
+
+    commit, dirty = git_commit()
+    meta = {
+        "commit": commit,
+        "dirty": dirty,
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "quick": args.quick,
+        "mock_latency": args.latency,
+        "mock_error_rate": args.error_rate,
+    }
+    output = os.path.abspath(
+        args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit or 'nogit'}.json"))
+    benches = {"fetch": bench_fetch, "cache": bench_cache, "plotly": bench_plotly, "gif": bench_gif}
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="weather-bench-") as workdir:
+        # The global cache instances are created relative to the working directory on import
+        os.chdir(workdir)
+        try:
+            for scenario in args.only or SCENARIOS:
+                for params, metrics in benches[scenario](server, workdir, quick=args.quick):
+                    record = {"scenario": scenario, "params": params, "metrics": metrics}
+                    results.append(record)
+                    print(json.dumps(record), flush=True)
+        finally:
+            os.chdir(cwd)
+    server.stop()
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"Wrote {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
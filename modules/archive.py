@@ -0,0 +1,215 @@
+"""
+Streamlit-free core of the ERA5 archive fetch: request planning against the cache,
+batched downloads on a FetchEngine and the sparse grid mode. Progress and errors are
+reported through optional callbacks, so the same code runs in the app, the pre-warmer
+and the batch CLI (modules/batch.py).
+"""
+import asyncio
+import datetime
+import os
+from concurrent.futures import as_completed
+from dataclasses import dataclass
+
+import numpy as np
+
+from modules.cache import cache_manager, params_hash, series_params_hash
+from modules.fetch import fetch_engine
+from modules.grid import ERA5_RESOLUTION, assemble_grid_dataset, grid_axes, grid_points_array, snap_grid
+from modules.interpolate import control_axes, holdout_error, interpolate_grid
+from modules.series import merge_series, missing_window, series_time_range
+
+# Open Meteo archive endpoint, overridable to point at a local mock server
+ARCHIVE_URL = os.environ.get("OPEN_METEO_ARCHIVE_URL", "https://archive-api.open-meteo.com/v1/era5")
+
+# Number of locations packed into one multi-coordinate request
+GRID_BATCH_SIZE = 50
+
+# Days of ERA5 history kept per grid cell, ending ARCHIVE_LAG_DAYS before today
+ARCHIVE_WINDOW_DAYS = 7
+ARCHIVE_LAG_DAYS = 2
+
+def archive_window(now=None):
+    """[start_date, end_date] of the archive series we keep, the archive lags a few days behind."""
+    end = (now or datetime.datetime.now()) - datetime.timedelta(days=ARCHIVE_LAG_DAYS)
+    start = end - datetime.timedelta(days=ARCHIVE_WINDOW_DAYS - 1)
+    return [start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")]
+
+def archive_params(latitude, longitude, window=None):
+    start_date, end_date = window or archive_window()
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "start_date": start_date,
+        "end_date": end_date,
+        "hourly": "temperature_2m,windspeed_10m,winddirection_10m",
+        "daily": "rain_sum",
+        "timezone": "auto"
+    }
+
+def batch_params(params_list):
+    """Merge single-point request params into one multi-location request."""
+    params = dict(params_list[0])
+    params["latitude"] = ",".join(str(p["latitude"]) for p in params_list)
+    params["longitude"] = ",".join(str(p["longitude"]) for p in params_list)
+    return params
+
+@dataclass
+class ArchiveRequest:
+    cell: tuple
+    params: dict          # Params of the complete window, stored with the cache entry
+    fetch_params: dict    # Params of the days that still have to be downloaded
+    cached: dict = None   # Cached series the download gets merged into
+
+def plan_archive_fetch(cells, refresh_margin=0, cache=cache_manager):
+    """
+    Split cells into cached data ({cell: data}) and the ArchiveRequests still needed.
+
+    A cached series covering part of the current window is kept and only the missing
+    days are requested, so refresh traffic grows with elapsed time, not with history
+    length. Published archive days do not change, so a series that already covers
+    the window is just trimmed and re-stored without any request. A series fetched
+    with other params than the dates (variables, timezone...) is never reused.
+    refresh_margin (seconds) also replans entries that would expire within that time.
+    """
+    window = archive_window()
+    ttl = cache.get_ttl("archive")
+    entries = cache.load_entry_many("archive", cells)
+    hits, requests, trimmed = {}, [], []
+    for cell in cells:
+        params = archive_params(*cell, window=window)
+        entry = entries.get(cell)
+        if entry is not None and entry.params_hash == params_hash(params) and (
+                ttl is None or ttl - entry.age() > refresh_margin):
+            hits[cell] = entry.data
+            continue
+        if entry is not None and entry.series_hash != series_params_hash(params):
+            # Not the same series over other dates: download the whole window
+            cache.record_stale("archive", "params_mismatch")
+            entry = None
+        covered = entry.time_range if entry is not None else None
+        fetch_window = missing_window(covered, window)
+        if fetch_window is None:
+            data = merge_series(entry.data, {}, window)
+            hits[cell] = data
+            trimmed.append((cell, data, params, window))
+        else:
+            if entry is not None:
+                # Too old or missing days: it still costs a request
+                cache.record_stale("archive", "expired")
+            cached = entry.data if covered else None
+            requests.append(ArchiveRequest(cell, params, archive_params(*cell, window=fetch_window), cached))
+    cache.save_many("archive", trimmed, source=ARCHIVE_URL)
+    return hits, requests
+
+def archive_batches(requests, batch_size=GRID_BATCH_SIZE):
+    """Group requests that need the same date window into multi-location batches."""
+    by_window = {}
+    for request in requests:
+        window = (request.fetch_params["start_date"], request.fetch_params["end_date"])
+        by_window.setdefault(window, []).append(request)
+    return [group[i:i + batch_size] for group in by_window.values() for i in range(0, len(group), batch_size)]
+
+def store_archive_results(batch, results, cache=cache_manager):
+    """Merge downloaded windows into their cached series, store them and return {cell: data}."""
+    merged, fetched = {}, []
+    for request, data in zip(batch, results):
+        if valid_archive_data(data):
+            window = [request.params["start_date"], request.params["end_date"]]
+            data = merge_series(request.cached, data, window)
+            merged[request.cell] = data
+            fetched.append((request.cell, data, request.params, series_time_range(data)))
+    cache.save_many("archive", fetched, source=ARCHIVE_URL)
+    return merged
+
+def valid_archive_data(data):
+    # Ensure 'temperature_2m' data is present
+    return isinstance(data, dict) and 'hourly' in data and 'temperature_2m' in data['hourly']
+
+async def fetch_archive_batch(params_list, engine=fetch_engine):
+    """
+    Fetch several points in one multi-location request and return one result per point.
+    Falls back to concurrent single-point requests when the batch call fails.
+    Must run on the loop of the given engine.
+    """
+    if len(params_list) > 1:
+        data = await engine.get_json_async(ARCHIVE_URL, batch_params(params_list))
+        # A multi-location request answers with a list, one result per location
+        if isinstance(data, list) and len(data) == len(params_list) and all(valid_archive_data(item) for item in data):
+            return data
+    return await asyncio.gather(*(engine.get_json_async(ARCHIVE_URL, params) for params in params_list))
+
+def fetch_archive_cells(cells, batch_size=GRID_BATCH_SIZE, engine=fetch_engine, cache=cache_manager,
+                        on_progress=None, on_error=None):
+    """
+    Fetch the archive series of every (already snapped) cell. Cached cells are read in
+    one bulk lookup, partially cached ones only download their missing days, and the
+    requests are sent batch_size locations at a time (Open-Meteo accepts comma separated
+    coordinates and answers with one result per location). A batch that fails is
+    retried point by point.
+
+    on_progress(done, total) is called after the cache lookup and after every batch,
+    on_error(cell, message) for every cell that finally failed; both run on the
+    calling thread. Returns {cell: data}.
+    """
+    weather_data = {}
+    total = len(cells)
+    hits, requests = plan_archive_fetch(cells, cache=cache)
+    weather_data.update(hits)
+    done = total - len(requests)
+    if on_progress:
+        on_progress(done, total)
+
+    # Batches run concurrently on the engine loop; results are collected on this thread
+    batches = archive_batches(requests, batch_size)
+    futures = {
+        engine.submit(fetch_archive_batch([request.fetch_params for request in batch], engine=engine)): batch
+        for batch in batches
+    }
+    for future in as_completed(futures):
+        batch = futures[future]
+        results = future.result()
+        weather_data.update(store_archive_results(batch, results, cache=cache))
+        if on_error:
+            for request, data in zip(batch, results):
+                if data is None:
+                    on_error(request.cell, "Error fetching data from Open Meteo API")
+                elif not valid_archive_data(data):
+                    on_error(request.cell, "Temperature data missing")
+        done += len(batch)
+        if on_progress:
+            on_progress(done, total)
+    return weather_data
+
+def fetch_grid_sparse(center_lat, center_lon, radius_km, num_points, control_points=5, method="bilinear",
+                      holdout_points=8, resolution=ERA5_RESOLUTION, seed=0, on_progress=None, on_error=None):
+    """
+    Fill the dense num_points x num_points grid from a coarse control_points x control_points
+    lattice, so the number of requests no longer grows with the display resolution.
+    A few extra dense points (holdout_points) are fetched but left out of the
+    interpolation, to measure its error.
+
+    Returns (grid Dataset like assemble_grid_dataset, error DataFrame with one row per
+    held-out point and variable). Callbacks as in fetch_archive_cells.
+    """
+    latitudes, longitudes = grid_axes(center_lat, center_lon, radius_km, num_points)
+    lattice_lat, lattice_lon = control_axes(latitudes, longitudes, control_points)
+    lat, lon = np.meshgrid(lattice_lat, lattice_lon, indexing="ij")
+    control_cells = snap_grid(np.column_stack([lat.ravel(), lon.ravel()]), resolution).cell_keys()
+
+    # Held-out points: dense cells that are not part of the lattice
+    lattice = set(control_cells)
+    candidates = [cell for cell in snap_grid(grid_points_array(center_lat, center_lon, radius_km, num_points),
+                                             resolution).cell_keys() if cell not in lattice]
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(candidates), size=min(holdout_points, len(candidates)), replace=False)
+    holdout_cells = [candidates[i] for i in sorted(picks)]
+
+    weather_data = fetch_archive_cells(control_cells + holdout_cells, on_progress=on_progress, on_error=on_error)
+    control = assemble_grid_dataset({cell: weather_data.get(cell) for cell in control_cells})
+    if control.time.size == 0:
+        return control, holdout_error(control, {})
+    holdout = {
+        cell: assemble_grid_dataset({cell: weather_data[cell]}).isel(latitude=0, longitude=0)
+        for cell in holdout_cells if weather_data.get(cell)
+    }
+    return interpolate_grid(control, latitudes, longitudes, method), holdout_error(control, holdout, method)
@@ -0,0 +1,157 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import Counter
+
+from modules.dataset import DEFAULT_BBOX, dataset_paths
+from modules.perf import perf
+
+ARTIFACT_DIR = ".cache/artifacts"
+
+def dataset_fingerprint(paths=None):
+    """Hash of the dataset files' names, sizes and modification times."""
+    from modules.store import load_index, source_fingerprint
+    try:
+        sources = source_fingerprint(paths or dataset_paths())
+    except FileNotFoundError:
+        # Only the array store is left, it records the files it was built from
+        index = load_index()
+        sources = index["sources"] if index else None
+    return hashlib.sha256(json.dumps(sources, sort_keys=True).encode()).hexdigest()
+
+def artifact_key(kind, variable, bbox=DEFAULT_BBOX, fingerprint=None, **parts):
+    """
+    Key of a rendered output: the dataset fingerprint, variable and bbox plus whatever
+    else the output depends on (time index, style, fps, ...).
+    """
+    return ArtifactCache.key(kind=kind, dataset=fingerprint or dataset_fingerprint(),
+                             variable=variable, bbox=[float(v) for v in bbox], **parts)
+
+class ArtifactCache:
+    """
+    Content-addressed store for rendered outputs (PNG frames, GIFs).
+
+    The file name is a hash of everything the output depends on (dataset fingerprint,
+    variable, time index, bbox, style, ...), so identical requests from any session share
+    one file and a changed dataset never serves stale images. Files are written to a
+    temporary name and renamed, so concurrent sessions never see partial output.
+    Total size is bounded; the least recently used files are evicted first.
+    """
+    def __init__(self, root=ARTIFACT_DIR, max_bytes=512 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        # Approximate total size on disk, from a directory scan plus our own writes
+        self._bytes = None
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(**parts):
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def path(self, key, ext):
+        return os.path.join(self.root, key[:2], f"{key}.{ext}")
+
+    def get(self, key, ext):
+        """Path of a cached artifact, or None. A hit refreshes its LRU position."""
+        path = self.path(key, ext)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.stats["misses"] += 1
+            perf.count("artifacts.misses")
+            return None
+        self.stats["hits"] += 1
+        perf.count("artifacts.hits")
+        return path
+
+    def get_bytes(self, key, ext):
+        path = self.get(key, ext)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            # Evicted between the lookup and the read
+            return None
+
+    def create(self, key, ext, write):
+        """
+        Produce an artifact by calling write(path) on a temporary file, then publish it
+        under its content key. Returns the final path.
+        """
+        path = self.path(key, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=f".tmp.{ext}")
+        os.close(fd)
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.stats["writes"] += 1
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += os.path.getsize(path)
+            over = self._bytes is None or self._bytes > self.max_bytes
+        if over:
+            self.evict()
+        return path
+
+    def put_bytes(self, key, ext, data):
+        def write(path):
+            with open(path, "wb") as f:
+                f.write(data)
+        return self.create(key, ext, write)
+
+    def get_or_create(self, key, ext, write):
+        return self.get(key, ext) or self.create(key, ext, write)
+
+    def evict(self):
+        """Delete least recently used artifacts until the total size fits max_bytes."""
+        with self._lock:
+            files = []
+            total = 0
+            for directory, _, names in os.walk(self.root):
+                for name in names:
+                    if ".tmp." in name:
+                        continue
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+            if total > self.max_bytes:
+                total = self._evict_files(files, total)
+            self._bytes = total
+
+    def _evict_files(self, files, total):
+        for _, size, path in sorted(files):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.stats["evictions"] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+        return total
+
+    def clear(self):
+        with self._lock:
+            for directory, _, names in os.walk(self.root):
+                for name in names:
+                    os.remove(os.path.join(directory, name))
+            self._bytes = 0
+
+# Global artifact cache instance
+artifact_cache = ArtifactCache()
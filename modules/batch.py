@@ -0,0 +1,173 @@
+"""
+Headless batch jobs: fill the archive cache for grid regions and the artifact store
+(static plots, animation frames, GIFs) for map regions, without Streamlit, e.g. from cron.
+
+    python -m modules.batch --grid 21.03 105.85 50 10 --map 90 -10 140 30 --start 2024-01-01 --end 2024-01-02
+    python -m modules.batch --jobs jobs.json --workers 4
+
+A jobs file holds {"grids": [{"latitude", "longitude", "radius_km", "num_points",
+"control_points"?}], "maps": [{"bbox", "variables"?, "start"?, "end"?, "styles"?,
+"gifs"?, "fps"?}]}. Every job runs in its own worker process.
+"""
+import argparse
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from modules.dataset import DEFAULT_BBOX, TIME_DIM
+
+# Frame styles of a map job: the static plot, the two animation modes of Map - Plot
+MAP_STYLES = ("static", "mesh", "raster")
+# GIF kinds of a map job: matplotlib contours or the NumPy rasterizer
+GIF_STYLES = ("contour", "raster")
+
+@dataclass
+class GridJob:
+    latitude: float
+    longitude: float
+    radius_km: float
+    num_points: int
+    control_points: int = None   # Use the sparse lattice mode with this many control points per axis
+
+@dataclass
+class MapJob:
+    bbox: tuple = DEFAULT_BBOX
+    variables: tuple = ("Temperature", "Wind")
+    start: str = None            # First valid_time to render (inclusive), default the first
+    end: str = None              # Last valid_time to render (inclusive), default the last
+    styles: tuple = MAP_STYLES
+    gifs: tuple = GIF_STYLES
+    fps: int = 2
+
+def time_range_indexes(data, start=None, end=None):
+    """Indexes of the time steps between start and end (inclusive), as rendered by the pages."""
+    times = data[TIME_DIM].values
+    mask = np.ones(len(times), dtype=bool)
+    if start is not None:
+        mask &= times >= np.datetime64(start)
+    if end is not None:
+        mask &= times <= np.datetime64(end)
+    return np.flatnonzero(mask).tolist()
+
+def run_grid_job(job):
+    """Fetch (or refresh) the archive series of every cell of a grid into the cache."""
+    from modules.archive import fetch_archive_cells, fetch_grid_sparse
+    from modules.grid import grid_points_array, snap_grid
+
+    errors = []
+    on_error = lambda cell, message: errors.append(f"{message} for {cell}")
+    if job.control_points:
+        grid, holdout = fetch_grid_sparse(job.latitude, job.longitude, job.radius_km, job.num_points,
+                                          job.control_points, on_error=on_error)
+        summary = {"cells": int(grid.latitude.size * grid.longitude.size),
+                   "holdout_mae": holdout.groupby("variable")["mae"].mean().to_dict()}
+    else:
+        cells = snap_grid(grid_points_array(job.latitude, job.longitude, job.radius_km, job.num_points)).cell_keys()
+        data = fetch_archive_cells(cells, on_error=on_error)
+        summary = {"cells": len(cells), "fetched": len(data)}
+    return {**summary, "errors": errors}
+
+def run_map_job(job):
+    """Render every requested style and GIF of a map region into the artifact store."""
+    from modules.artifacts import dataset_fingerprint
+    from modules.dataset import open_map_data
+    from modules.derived import DerivedFields
+    from modules.frames import (
+        MESH_STYLE, RASTER_STYLE, create_gif, frame_pngs, mesh_renderer, plot_png, raster_renderer,
+    )
+
+    bbox = tuple(job.bbox)
+    data = open_map_data(bbox)
+    derived = DerivedFields(data)
+    fingerprint = dataset_fingerprint()
+    indexes = time_range_indexes(data, job.start, job.end)
+    renderers = {"mesh": (MESH_STYLE, mesh_renderer), "raster": (RASTER_STYLE, raster_renderer)}
+
+    frames = gifs = 0
+    for variable in job.variables:
+        for style in job.styles:
+            if style == "static":
+                levels = derived.levels(variable)
+                for time_index in indexes:
+                    plot_png(variable, data.latitude, data.longitude, data, derived, time_index, levels,
+                             fingerprint, bbox=bbox)
+                    frames += 1
+            else:
+                key_style, make_renderer = renderers[style]
+                for _ in frame_pngs(variable, indexes, key_style,
+                                    lambda: make_renderer(variable, data, derived, bbox=bbox), fingerprint, bbox=bbox):
+                    frames += 1
+        for style in job.gifs:
+            # Already inside a worker process: render the frames inline
+            create_gif(variable, data, derived, job.fps, workers=1, fast=style == "raster",
+                       times=indexes, bbox=bbox, fingerprint=fingerprint)
+            gifs += 1
+    return {"time_steps": len(indexes), "frames": frames, "gifs": gifs}
+
+def _run(kind, job):
+    started = time.perf_counter()
+    result = run_grid_job(job) if kind == "grid" else run_map_job(job)
+    return {"kind": kind, "job": asdict(job), **result, "seconds": round(time.perf_counter() - started, 3)}
+
+def run_jobs(jobs, workers=None):
+    """
+    Run (kind, job) pairs in a process pool and yield one result dict per job as it
+    finishes. A failing job yields its error instead of stopping the others.
+    """
+    # spawn: like modules/render.py, never fork a process with running threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        futures = {pool.submit(_run, kind, job): (kind, job) for kind, job in jobs}
+        for future in as_completed(futures):
+            kind, job = futures[future]
+            try:
+                yield future.result()
+            except Exception as e:
+                yield {"kind": kind, "job": asdict(job), "error": repr(e)}
+
+def load_jobs(path):
+    with open(path, 'r') as f:
+        spec = json.load(f)
+    jobs = [("grid", GridJob(**grid)) for grid in spec.get("grids", [])]
+    jobs += [("map", MapJob(**{k: tuple(v) if isinstance(v, list) else v for k, v in map_job.items()}))
+             for map_job in spec.get("maps", [])]
+    return jobs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute archive grids and rendered map outputs.")
+    parser.add_argument("--jobs", help="JSON file of grid and map jobs")
+    parser.add_argument("--grid", type=float, nargs=4, action="append", default=[],
+                        metavar=("LAT", "LON", "RADIUS_KM", "NUM_POINTS"), help="Grid region to fetch (repeatable)")
+    parser.add_argument("--control-points", type=int, help="Fetch --grid regions in sparse lattice mode")
+    parser.add_argument("--map", type=float, nargs=4, action="append", default=[],
+                        metavar=("LON_MIN", "LAT_MIN", "LON_MAX", "LAT_MAX"), help="Map region to render (repeatable)")
+    parser.add_argument("--variable", action="append", choices=("Temperature", "Wind"), help="Map variables")
+    parser.add_argument("--style", action="append", choices=MAP_STYLES, help="Frame styles to render")
+    parser.add_argument("--gif", action="append", choices=GIF_STYLES, help="GIFs to render")
+    parser.add_argument("--start", help="First time step of --map regions (e.g. 2024-01-01T00:00)")
+    parser.add_argument("--end", help="Last time step of --map regions")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    jobs = load_jobs(args.jobs) if args.jobs else []
+    jobs += [("grid", GridJob(lat, lon, radius, int(n), args.control_points)) for lat, lon, radius, n in args.grid]
+    map_options = {"start": args.start, "end": args.end}
+    for name, value in (("variables", args.variable), ("styles", args.style), ("gifs", args.gif)):
+        if value:
+            map_options[name] = tuple(value)
+    jobs += [("map", MapJob(bbox=tuple(bbox), **map_options)) for bbox in args.map]
+    if not jobs:
+        parser.error("nothing to do, pass --jobs, --grid or --map")
+
+    failed = 0
+    for result in run_jobs(jobs, args.workers):
+        failed += "error" in result
+        print(json.dumps(result, default=str), flush=True)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,41 +1,352 @@
-import os
 import json
+import time
 import hashlib
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, asdict, field
+
+from modules.cache_backends import BACKENDS
+from modules.perf import perf
+
+# Default time-to-live (seconds) per namespace. None means the entry never expires.
+DEFAULT_NAMESPACES = {
+    "forecast": 60 * 60,        # Forecast API, refreshed upstream every hour
+    "archive": 24 * 60 * 60,    # ERA5 archive, only changes when the date window moves
+    "config": None,             # User settings
+}
+
+def params_hash(params):
+    """Stable hash of a request parameter dict, used to tell cache entries apart."""
+    if params is None:
+        return None
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.md5(payload.encode()).hexdigest()
+
+# Request params that only select the date window of a time series
+WINDOW_PARAMS = ("start_date", "end_date")
+
+def series_params_hash(params):
+    """params_hash without the date window: equal for two requests of the same series over other dates."""
+    if params is None:
+        return None
+    return params_hash({k: v for k, v in params.items() if k not in WINDOW_PARAMS})
+
+@dataclass
+class CacheEntry:
+    data: object
+    fetched_at: float = field(default_factory=time.time)
+    source: str = None
+    params_hash: str = None
+    time_range: list = None     # [first, last] date covered by a time series, if any
+    series_hash: str = None     # series_params_hash of a time series, to extend it with other dates
+
+    def age(self, now=None):
+        return (now if now is not None else time.time()) - self.fetched_at
+
+    def is_expired(self, ttl, now=None):
+        return ttl is not None and self.age(now) > ttl
+
+    def to_dict(self):
+        entry = asdict(self)
+        data = entry.pop("data")
+        return {"meta": entry, "data": data}
+
+    @classmethod
+    def from_dict(cls, payload):
+        return cls(data=payload["data"], **payload["meta"])
 
 class CacheManager:
-    def __init__(self, cache_dir="cache"):
+    """
+    Two-tier cache: an in-process LRU of decoded entries in front of a disk backend.
+
+    The disk backend is pluggable ("json" keeps one file per entry, "sqlite" packs every
+    entry into a single compressed database, see modules/cache_backends.py).
+    The memory tier is shared by every Streamlit session of the server process. Both tiers
+    are bounded by entry count and approximate byte size; the disk tier only evicts
+    namespaces with a TTL (expired entries first, then least recently used), so settings
+    in ttl-less namespaces such as "config" are never dropped.
+    """
+    def __init__(self, cache_dir="cache", namespaces=None, backend="json",
+                 memory_max_entries=512, memory_max_bytes=64 * 1024 * 1024,
+                 disk_max_entries=20000, disk_max_bytes=1024 * 1024 * 1024):
         self.cache_dir = cache_dir
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
+        self.namespaces = dict(DEFAULT_NAMESPACES if namespaces is None else namespaces)
+        self.backend = BACKENDS[backend](cache_dir) if isinstance(backend, str) else backend
+        for namespace in self.namespaces:
+            self.backend.create_namespace(namespace)
+
+        self.memory_max_entries = memory_max_entries
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_entries = disk_max_entries
+        self.disk_max_bytes = disk_max_bytes
+
+        self.stats = Counter()
+        self._lock = threading.RLock()
+        # (namespace, key) -> (CacheEntry, size in bytes), most recently used last
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        # (namespace, key) -> [size in bytes, written at, last access], built lazily
+        self._disk_index = None
+        self._disk_bytes = 0
+
+    def get_ttl(self, namespace):
+        self._check_namespace(namespace)
+        return self.namespaces[namespace]
 
     def get_cache_key(self, *args):
         key = "_".join(map(str, args))
         # return hashlib.md5(key.encode()).hexdigest()
         return key
 
-    def get_cache_file(self, key):
-        return os.path.join(self.cache_dir, f"{key}.json")
-
-    def load(self, *args):
+    def load_entry(self, namespace, *args):
+        """
+        Return the raw CacheEntry stored under the namespace/key, ignoring TTL,
+        or None when nothing (or an unreadable value) is stored there.
+        The returned data is shared with the memory tier and must not be mutated.
+        """
         key = self.get_cache_key(*args)
-        cache_file = self.get_cache_file(key)
-        if os.path.exists(cache_file):
-            with open(cache_file, 'r') as f:
-                return json.load(f)
-        return None
+        return self._load_entries(namespace, [key]).get(key)
 
-    def save(self, data, *args):
-        key = self.get_cache_key(*args)
-        cache_file = self.get_cache_file(key)
-        with open(cache_file, 'w') as f:
-            json.dump(data, f)
+    def load(self, namespace, *args, params=None):
+        """
+        Return cached data if it exists, has not outlived the namespace TTL and,
+        when params are given, was fetched with the same request parameters.
+        """
+        return self._check_entry(namespace, self.load_entry(namespace, *args), params)
+
+    def load_entry_many(self, namespace, keys):
+        """Bulk version of load_entry: {key tuple: CacheEntry} for the stored keys."""
+        keys = [tuple(key) for key in keys]
+        entries = self._load_entries(namespace, [self.get_cache_key(*key) for key in keys])
+        return {key: entries[self.get_cache_key(*key)] for key in keys if self.get_cache_key(*key) in entries}
+
+    def load_many(self, namespace, keys, params_list=None):
+        """
+        Bulk version of load. keys is a list of argument tuples; params_list, if given,
+        holds the matching request params. Returns {key tuple: data} for the hits only.
+        """
+        keys = [tuple(key) for key in keys]
+        params_list = params_list if params_list is not None else [None] * len(keys)
+        entries = self._load_entries(namespace, [self.get_cache_key(*key) for key in keys])
+        found = {}
+        for key, params in zip(keys, params_list):
+            data = self._check_entry(namespace, entries.get(self.get_cache_key(*key)), params)
+            if data is not None:
+                found[key] = data
+        return found
 
-    def clear_cache(self, *args):
+    def save(self, data, namespace, *args, source=None, params=None, time_range=None):
+        return self.save_many(namespace, [(args, data, params, time_range)], source=source)[0]
+
+    def save_many(self, namespace, items, source=None):
+        """
+        Store several (key tuple, data, params) items in one backend write. Items may
+        carry a fourth element, the [first, last] time range covered by the data; those
+        time series also record their params hash without the date window.
+        """
+        self._check_namespace(namespace)
+        with perf.span("cache.save", namespace=namespace, keys=len(items)):
+            entries, rows = [], []
+            for args, data, params, *time_range in items:
+                time_range = time_range[0] if time_range else None
+                entry = CacheEntry(data=data, source=source, params_hash=params_hash(params), time_range=time_range,
+                                   series_hash=series_params_hash(params) if time_range else None)
+                key = self.get_cache_key(*args)
+                entries.append(entry)
+                rows.append((key, entry, json.dumps(entry.to_dict()).encode()))
+            self.backend.put_many(namespace, [(key, raw) for key, _, raw in rows])
+            with self._lock:
+                for key, entry, raw in rows:
+                    self.stats["saves"] += 1
+                    self._remember(namespace, key, entry, len(raw))
+                    self._index_disk(namespace, key, len(raw))
+                self._evict_disk()
+        return entries
+
+    def clear_cache(self, namespace, *args):
+        self._check_namespace(namespace)
         key = self.get_cache_key(*args)
-        cache_file = self.get_cache_file(key)
-        if os.path.exists(cache_file):
-            os.remove(cache_file)
+        with self._lock:
+            self._forget(namespace, key)
+        self.backend.delete(namespace, key)
+
+    def clear_namespace(self, namespace):
+        """Remove every entry of one namespace, leaving the others untouched."""
+        self._check_namespace(namespace)
+        for key in self.backend.keys(namespace):
+            self.clear_cache(namespace, key)
+
+    def get_stats(self):
+        """Hit/miss/eviction counters plus the current size of both tiers."""
+        with self._lock:
+            self._load_disk_index()
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            # Entries found but not used (see record_stale) do not count as hits
+            hits = (self.stats["memory_hits"] + self.stats["disk_hits"]
+                    - self.stats["expired"] - self.stats["params_mismatch"])
+            return {
+                **self.stats,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk_index),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def record_stale(self, namespace, reason):
+        """
+        Count a stored entry that was found but not used ("expired" or "params_mismatch").
+        Callers of load_entry that judge entries themselves report them here.
+        """
+        with self._lock:
+            self.stats[reason] += 1
+        perf.count(f"cache.{namespace}.{reason}")
+
+    def purge_expired(self, namespace=None):
+        """Drop expired entries so only stale data is refetched after a purge."""
+        removed = 0
+        namespaces = [namespace] if namespace else list(self.namespaces)
+        now = time.time()
+        for ns in namespaces:
+            ttl = self.get_ttl(ns)
+            if ttl is None:
+                continue
+            for key in self.backend.keys(ns):
+                entry = self.load_entry(ns, key)
+                if entry is None or entry.is_expired(ttl, now):
+                    self.clear_cache(ns, key)
+                    removed += 1
+        return removed
+
+    def _load_entries(self, namespace, keys):
+        self._check_namespace(namespace)
+        with perf.span("cache.load", namespace=namespace, keys=len(keys)) as tags:
+            found = self._read_entries(namespace, keys)
+            tags["found"] = len(found)
+        return found
+
+    def _read_entries(self, namespace, keys):
+        found, missing = {}, []
+        with self._lock:
+            for key in keys:
+                cached = self._memory.get((namespace, key))
+                if cached is not None:
+                    self._memory.move_to_end((namespace, key))
+                    self._touch_disk(namespace, key)
+                    self.stats["memory_hits"] += 1
+                    found[key] = cached[0]
+                else:
+                    missing.append(key)
+        perf.count(f"cache.{namespace}.memory_hits", len(keys) - len(missing))
+        if not missing:
+            return found
+
+        raw_values = self.backend.get_many(namespace, missing)
+        with self._lock:
+            for key in missing:
+                raw = raw_values.get(key)
+                try:
+                    entry = CacheEntry.from_dict(json.loads(raw))
+                except (ValueError, KeyError, TypeError):
+                    # Missing, corrupt or legacy (pre-namespace) value, treat as a miss
+                    self.stats["misses"] += 1
+                    continue
+                self.stats["disk_hits"] += 1
+                self._touch_disk(namespace, key)
+                self._remember(namespace, key, entry, len(raw))
+                found[key] = entry
+        perf.count(f"cache.{namespace}.disk_hits", len(found) - len(keys) + len(missing))
+        perf.count(f"cache.{namespace}.misses", len(keys) - len(found))
+        return found
+
+    def _check_entry(self, namespace, entry, params):
+        if entry is None:
+            return None
+        if entry.is_expired(self.get_ttl(namespace)):
+            self.record_stale(namespace, "expired")
+            return None
+        if params is not None and entry.params_hash != params_hash(params):
+            self.record_stale(namespace, "params_mismatch")
+            return None
+        return entry.data
+
+    # Memory tier
+
+    def _remember(self, namespace, key, entry, size):
+        old = self._memory.pop((namespace, key), None)
+        if old is not None:
+            self._memory_bytes -= old[1]
+        if size > self.memory_max_bytes:
+            return
+        self._memory[(namespace, key)] = (entry, size)
+        self._memory_bytes += size
+        while len(self._memory) > self.memory_max_entries or self._memory_bytes > self.memory_max_bytes:
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+            self.stats["memory_evictions"] += 1
+
+    def _forget(self, namespace, key):
+        old = self._memory.pop((namespace, key), None)
+        if old is not None:
+            self._memory_bytes -= old[1]
+        if self._disk_index is not None:
+            info = self._disk_index.pop((namespace, key), None)
+            if info is not None:
+                self._disk_bytes -= info[0]
+
+    # Disk tier
+
+    def _load_disk_index(self):
+        if self._disk_index is not None:
+            return
+        self._disk_index = {}
+        self._disk_bytes = 0
+        for namespace in self.namespaces:
+            for key, size, written_at, accessed_at in self.backend.scan(namespace):
+                self._disk_index[(namespace, key)] = [size, written_at, accessed_at]
+                self._disk_bytes += size
+
+    def _index_disk(self, namespace, key, size):
+        self._load_disk_index()
+        now = time.time()
+        old = self._disk_index.get((namespace, key))
+        if old is not None:
+            self._disk_bytes -= old[0]
+        self._disk_index[(namespace, key)] = [size, now, now]
+        self._disk_bytes += size
+
+    def _touch_disk(self, namespace, key):
+        if self._disk_index is not None and (namespace, key) in self._disk_index:
+            self._disk_index[(namespace, key)][2] = time.time()
+
+    def _evict_disk(self):
+        self._load_disk_index()
+        if len(self._disk_index) <= self.disk_max_entries and self._disk_bytes <= self.disk_max_bytes:
+            return
+        now = time.time()
+
+        def priority(item):
+            (namespace, _), (_, written_at, accessed_at) = item
+            # Expired entries go first, then least recently used
+            expired = now - written_at > self.namespaces[namespace]
+            return (not expired, accessed_at)
+
+        candidates = sorted(
+            (item for item in self._disk_index.items() if self.namespaces[item[0][0]] is not None),
+            key=priority,
+        )
+        for (namespace, key), _ in candidates:
+            if len(self._disk_index) <= self.disk_max_entries and self._disk_bytes <= self.disk_max_bytes:
+                break
+            self._forget(namespace, key)
+            self.backend.delete(namespace, key)
+            self.stats["disk_evictions"] += 1
+
+    def _check_namespace(self, namespace):
+        if namespace not in self.namespaces:
+            raise ValueError(f"Unknown cache namespace: {namespace!r}")
 
 cache_manager = CacheManager(
-    cache_dir=".cache"
-)
\ No newline at end of file
+    cache_dir=".cache",
+    backend="sqlite",
+)
@@ -0,0 +1,163 @@
+import os
+import time
+import zlib
+import sqlite3
+import tempfile
+import threading
+
+class JsonFileBackend:
+    """
+    One plain JSON file per entry under <cache_dir>/<namespace>/<key>.json.
+    Writes go to a temporary file that is atomically renamed over the target,
+    so concurrent writers can never leave a truncated file behind.
+    """
+    suffix = ".json"
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def create_namespace(self, namespace):
+        os.makedirs(os.path.join(self.cache_dir, namespace), exist_ok=True)
+
+    def get_cache_file(self, namespace, key):
+        return os.path.join(self.cache_dir, namespace, f"{key}{self.suffix}")
+
+    def get(self, namespace, key):
+        try:
+            with open(self.get_cache_file(namespace, key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def get_many(self, namespace, keys):
+        return {key: raw for key in keys if (raw := self.get(namespace, key)) is not None}
+
+    def put(self, namespace, key, raw):
+        directory = os.path.join(self.cache_dir, namespace)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(raw)
+            os.replace(tmp_path, self.get_cache_file(namespace, key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def put_many(self, namespace, items):
+        for key, raw in items:
+            self.put(namespace, key, raw)
+
+    def delete(self, namespace, key):
+        try:
+            os.remove(self.get_cache_file(namespace, key))
+        except FileNotFoundError:
+            pass
+
+    def keys(self, namespace):
+        directory = os.path.join(self.cache_dir, namespace)
+        return [name[:-len(self.suffix)] for name in os.listdir(directory) if name.endswith(self.suffix)]
+
+    def scan(self, namespace):
+        """Yield (key, size in bytes, written at, last access) for every stored entry."""
+        with os.scandir(os.path.join(self.cache_dir, namespace)) as it:
+            for item in it:
+                if item.name.endswith(self.suffix):
+                    stat = item.stat()
+                    yield item.name[:-len(self.suffix)], stat.st_size, stat.st_mtime, stat.st_atime
+
+class SqliteBackend:
+    """
+    All entries in a single SQLite database with zlib-compressed values.
+
+    Upserts are atomic and the database runs in WAL mode, so several Streamlit
+    sessions, coroutines and server processes can read and write it concurrently.
+    Each thread gets its own connection.
+    """
+    def __init__(self, path, compression_level=6, timeout=30):
+        self.path = path
+        self.compression_level = compression_level
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " written_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create_namespace(self, namespace):
+        pass
+
+    def get(self, namespace, key):
+        row = self._connection().execute(
+            "SELECT value FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        return zlib.decompress(row[0]) if row else None
+
+    def get_many(self, namespace, keys):
+        keys = list(keys)
+        found = {}
+        # Stay well below SQLite's bound parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._connection().execute(
+                f"SELECT key, value FROM entries WHERE namespace = ? AND key IN ({placeholders})",
+                (namespace, *chunk),
+            )
+            found.update((key, zlib.decompress(value)) for key, value in rows)
+        return found
+
+    def put(self, namespace, key, raw):
+        self.put_many(namespace, [(key, raw)])
+
+    def put_many(self, namespace, items):
+        now = time.time()
+        rows = [
+            (namespace, key, zlib.compress(raw, self.compression_level), len(raw), now)
+            for key, raw in items
+        ]
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT INTO entries (namespace, key, value, size, written_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(namespace, key) DO UPDATE SET "
+                "value = excluded.value, size = excluded.size, written_at = excluded.written_at",
+                rows,
+            )
+
+    def delete(self, namespace, key):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def keys(self, namespace):
+        rows = self._connection().execute("SELECT key FROM entries WHERE namespace = ?", (namespace,))
+        return [key for (key,) in rows]
+
+    def scan(self, namespace):
+        rows = self._connection().execute(
+            "SELECT key, size, written_at FROM entries WHERE namespace = ?", (namespace,)
+        )
+        for key, size, written_at in rows.fetchall():
+            yield key, size, written_at, written_at
+
+BACKENDS = {
+    "json": lambda cache_dir: JsonFileBackend(cache_dir),
+    "sqlite": lambda cache_dir: SqliteBackend(os.path.join(cache_dir, "cache.sqlite3")),
+}
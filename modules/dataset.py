@@ -0,0 +1,66 @@
+import glob
+
+import streamlit as st
+import xarray as xr
+
+from modules.perf import perf
+
+DATASET_PATH = './dataset/data_stream-oper_stepType-instant.nc'
+# Monthly (or any time-split) files of the same stream are opened as one time series
+DATASET_GLOB = './dataset/data_stream-oper_stepType-instant*.nc'
+
+TIME_DIM = "valid_time"
+
+# Region shown by the map pages: (lon_min, lat_min, lon_max, lat_max)
+DEFAULT_BBOX = (90, -10, 140, 30)
+
+# One time step per chunk: a frame only ever reads one time slice of the region
+DEFAULT_CHUNKS = {TIME_DIM: 1}
+
+def dataset_paths(pattern=DATASET_GLOB):
+    paths = sorted(glob.glob(pattern))
+    return paths or [DATASET_PATH]
+
+def subset_bbox(data, bbox):
+    """Select the bbox lazily, whatever the order of the latitude/longitude axes."""
+    if bbox is None:
+        return data
+    lon_min, lat_min, lon_max, lat_max = bbox
+    lat = data.latitude.values
+    lon = data.longitude.values
+    lat_slice = slice(lat_max, lat_min) if lat[0] > lat[-1] else slice(lat_min, lat_max)
+    lon_slice = slice(lon_max, lon_min) if lon[0] > lon[-1] else slice(lon_min, lon_max)
+    return data.sel(latitude=lat_slice, longitude=lon_slice)
+
+def open_data(paths=None, bbox=DEFAULT_BBOX, chunks=DEFAULT_CHUNKS):
+    """
+    Open the dataset lazily (dask chunks along time) and cut it to bbox before any
+    value is read. Several files are combined into one time series.
+    """
+    paths = paths or dataset_paths()
+    if len(paths) == 1:
+        data = xr.open_dataset(paths[0], chunks=chunks)
+    else:
+        data = xr.open_mfdataset(
+            paths,
+            combine="by_coords",
+            chunks=chunks,
+            data_vars="minimal",
+            coords="minimal",
+            compat="override",
+        )
+    return subset_bbox(data, bbox)
+
+@perf.timed("data.open")
+def open_map_data(bbox=DEFAULT_BBOX):
+    # Prefer the memory-mapped store (modules/store.py) when it is up to date
+    from modules.store import open_store, store_is_fresh
+    if store_is_fresh(bbox=bbox):
+        return subset_bbox(open_store(), bbox)
+    return open_data(bbox=bbox)
+
+@st.cache_resource
+def load_data(bbox=DEFAULT_BBOX):
+    # Load the weather data, shared by both map pages
+    data = open_map_data(bbox=bbox)
+    return data
@@ -0,0 +1,93 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import streamlit as st
+
+from modules.dataset import load_data
+from modules.perf import perf
+
+# Time steps converted together; also the unit kept in memory
+CHUNK_SIZE = 24
+# Converted chunks kept per process (None keeps everything)
+MAX_CACHED_CHUNKS = 32
+
+VARIABLES = ("Temperature", "Wind")
+
+class DerivedFields:
+    """
+    Plot-ready float32 fields per variable ("Temperature" in °C, "Wind" speed in m/s)
+    plus their per-time-step and global min/max, computed lazily per time chunk.
+
+    Each chunk is converted in one vectorized pass that also records its frame
+    stats; the most recently used chunks are kept, so frame access is slicing.
+    Shared by every session, hence the lock.
+    """
+    def __init__(self, data, chunk_size=CHUNK_SIZE, max_chunks=MAX_CACHED_CHUNKS):
+        self.data = data
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.num_times = data.valid_time.size
+        self.frame_min = {name: np.full(self.num_times, np.nan, dtype=np.float32) for name in VARIABLES}
+        self.frame_max = {name: np.full(self.num_times, np.nan, dtype=np.float32) for name in VARIABLES}
+        self._has_stats = np.zeros(self.num_times, dtype=bool)
+        self._chunks = OrderedDict()
+        self._lock = threading.RLock()
+
+    def field(self, variable, time_index):
+        start = time_index - time_index % self.chunk_size
+        return self._chunk(start)[variable][time_index - start]
+
+    def frames(self, variable):
+        """Iterate over every time step of a variable, chunk by chunk."""
+        for start in range(0, self.num_times, self.chunk_size):
+            yield from self._chunk(start)[variable]
+
+    def zrange(self, variable):
+        """Global (min, max), so every frame shares one colorbar. Streams any chunk not seen yet."""
+        with self._lock:
+            for start in range(0, self.num_times, self.chunk_size):
+                if not self._has_stats[start]:
+                    self._chunk(start)
+        return float(np.nanmin(self.frame_min[variable])), float(np.nanmax(self.frame_max[variable]))
+
+    def levels(self, variable, num_levels=20):
+        """Fixed contour levels spanning the global range."""
+        return np.linspace(*self.zrange(variable), num_levels)
+
+    def _chunk(self, start):
+        with self._lock:
+            chunk = self._chunks.get(start)
+            if chunk is not None:
+                self._chunks.move_to_end(start)
+                return chunk
+
+            time_slice = slice(start, start + self.chunk_size)
+            chunk = self._decode(time_slice)
+            for name, values in chunk.items():
+                self.frame_min[name][time_slice] = np.nanmin(values, axis=(1, 2))
+                self.frame_max[name][time_slice] = np.nanmax(values, axis=(1, 2))
+            self._has_stats[time_slice] = True
+
+            self._chunks[start] = chunk
+            if self.max_chunks is not None and len(self._chunks) > self.max_chunks:
+                self._chunks.popitem(last=False)
+            return chunk
+
+    @perf.timed("data.decode")
+    def _decode(self, time_slice):
+        # Reads (and decompresses) the raw variables of the chunk
+        t2m = self.data.t2m[time_slice].values
+        temperature = np.empty(t2m.shape, dtype=np.float32)
+        wind_speed = np.empty(t2m.shape, dtype=np.float32)
+        # Temperature array: subtract 273.15 to convert from K to °C
+        np.subtract(t2m, 273.15, out=temperature, casting="unsafe")
+        # Wind speed magnitude
+        np.hypot(self.data.u10[time_slice].values, self.data.v10[time_slice].values,
+                 out=wind_speed, casting="unsafe")
+        return {"Temperature": temperature, "Wind": wind_speed}
+
+@st.cache_resource
+def load_derived_fields():
+    # Created once per server process and shared by both map pages
+    return DerivedFields(load_data())
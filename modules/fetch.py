@@ -0,0 +1,141 @@
+import atexit
+import asyncio
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from modules.perf import perf
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class FetchEngine:
+    """
+    Shared HTTP client for every Open-Meteo request of the server process.
+
+    Requests run on a private event loop in a daemon thread, so one keep-alive
+    aiohttp session is reused across Streamlit reruns and sessions. At most
+    max_in_flight requests are on the wire at once, each with its own timeout;
+    429/5xx answers and network errors are retried with exponential backoff,
+    and identical requests that are in flight at the same time share one call.
+    """
+    def __init__(self, max_in_flight=8, timeout=30, retries=3, backoff=0.5, max_backoff=10):
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._semaphore = None
+        self._in_flight = {}
+        self._start_lock = threading.Lock()
+
+    # Sync API, callable from any thread
+
+    def submit(self, coro):
+        """Schedule a coroutine on the engine loop and return a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro):
+        """Run a coroutine on the engine loop and wait for its result."""
+        return self.submit(coro).result()
+
+    def get_json(self, url, params):
+        return self.run(self.get_json_async(url, params))
+
+    def close(self):
+        """Close the pooled session; a later request transparently opens a new one."""
+        if self._loop is not None and self._session is not None:
+            self.run(self._session.close())
+
+    # Async API, only valid on the engine loop (i.e. inside submit/run)
+
+    async def get_json_async(self, url, params):
+        """Return the decoded JSON body, or None once retries are exhausted."""
+        key = (url, tuple(sorted((k, str(v)) for k, v in params.items())))
+        task = self._in_flight.get(key)
+        if task is not None:
+            perf.count("fetch.shared")
+        else:
+            task = asyncio.ensure_future(self._get_json(url, params))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # shield: one caller being cancelled must not cancel the shared request
+        return await asyncio.shield(task)
+
+    async def _get_json(self, url, params):
+        session = await self._get_session()
+        endpoint = urlsplit(url).path
+        with perf.span("fetch.request", endpoint=endpoint) as tags:
+            for attempt in range(self.retries + 1):
+                retry_after = None
+                tags["attempts"] = attempt + 1
+                try:
+                    queued = time.perf_counter()
+                    async with self._semaphore:
+                        perf.record("fetch.queue", time.perf_counter() - queued)
+                        with perf.span("fetch.attempt", endpoint=endpoint) as attempt_tags:
+                            async with session.get(url, params=params) as response:
+                                attempt_tags["status"] = tags["status"] = response.status
+                                if response.status == 200:
+                                    try:
+                                        return await response.json()
+                                    except ValueError as e:
+                                        # A malformed body will not get better on retry
+                                        print(f"Invalid JSON from Open Meteo API: {e!r}")
+                                        tags["status"] = attempt_tags["status"] = "invalid_json"
+                                        perf.count("fetch.failures")
+                                        return None
+                                if response.status not in RETRY_STATUSES:
+                                    print(f"Error fetching data from Open Meteo API: HTTP {response.status}")
+                                    perf.count("fetch.failures")
+                                    return None
+                                retry_after = response.headers.get("Retry-After")
+                                error = f"HTTP {response.status}"
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = repr(e)
+                    tags["status"] = type(e).__name__
+
+                if attempt == self.retries:
+                    print(f"Giving up on {url} after {attempt + 1} attempts: {error}")
+                    perf.count("fetch.failures")
+                    return None
+                perf.count("fetch.retries")
+                await asyncio.sleep(self._delay(attempt, retry_after))
+
+    def _delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.backoff * 2 ** attempt, self.max_backoff))
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_in_flight, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="fetch-engine", daemon=True
+                )
+                self._thread.start()
+        return self._loop
+
+fetch_engine = FetchEngine()
+atexit.register(fetch_engine.close)
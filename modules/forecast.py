@@ -0,0 +1,57 @@
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from modules.perf import perf
+
+# (row title, [(block, column, trace name, kind)]) of the forecast figure, top to bottom
+FORECAST_PANELS = (
+    ("Temperature (°C)", [("hourly", "temperature_2m", "Hourly temperature", "line")]),
+    ("Wind speed (km/h)", [("hourly", "windspeed_10m", "Hourly wind speed", "line")]),
+    ("Wind direction (°)", [("hourly", "winddirection_10m", "Hourly wind direction", "line")]),
+    ("Daily temperature (°C)", [("daily", "temperature_2m_max", "Daily max", "bar"),
+                                ("daily", "temperature_2m_min", "Daily min", "bar")]),
+    ("Daily wind speed (km/h)", [("daily", "windspeed_10m_max", "Daily max wind speed", "bar")]),
+)
+
+def payload_hash(payload):
+    """Stable hash of a forecast response, the key of every derived view."""
+    return hashlib.md5(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+def series_frame(block):
+    """
+    Column block of an Open-Meteo response ({"time": [...], var: [...]}) as a DataFrame
+    indexed by datetime64 time, with float32 columns (JSON nulls become NaN).
+    """
+    block = block or {}
+    times = np.asarray(block.get("time", []), dtype="datetime64[ns]")
+    columns = {name: np.asarray(values, dtype=np.float32) for name, values in block.items() if name != "time"}
+    return pd.DataFrame(columns, index=pd.DatetimeIndex(times, name="time"))
+
+def forecast_frames(payload):
+    """(hourly, daily) DataFrames of a forecast response."""
+    return series_frame(payload.get("hourly")), series_frame(payload.get("daily"))
+
+@perf.timed("forecast.figure")
+def forecast_figure(hourly, daily):
+    """All forecast series in one figure of stacked subplots sharing the time axis."""
+    frames = {"hourly": hourly, "daily": daily}
+    fig = make_subplots(rows=len(FORECAST_PANELS), cols=1, shared_xaxes=True, vertical_spacing=0.03,
+                        subplot_titles=[title for title, _ in FORECAST_PANELS])
+    for row, (_, traces) in enumerate(FORECAST_PANELS, start=1):
+        for block, column, name, kind in traces:
+            frame = frames[block]
+            if column not in frame:
+                continue
+            if kind == "line":
+                trace = go.Scatter(x=frame.index, y=frame[column], name=name, mode="lines")
+            else:
+                trace = go.Bar(x=frame.index, y=frame[column], name=name)
+            fig.add_trace(trace, row=row, col=1)
+    fig.update_layout(height=220 * len(FORECAST_PANELS), barmode="group", hovermode="x unified",
+                      margin=dict(l=20, r=20, t=40, b=20))
+    return fig
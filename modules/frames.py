@@ -0,0 +1,121 @@
+"""
+Rendering of map_old style outputs (static plots, animation frames, GIFs) into the
+artifact cache, without any Streamlit call: used by the Map - Plot page and by the
+batch CLI (modules/batch.py).
+"""
+import io
+
+import imageio
+import matplotlib.pyplot as plt
+
+from modules.artifacts import artifact_cache, artifact_key, dataset_fingerprint
+from modules.dataset import DEFAULT_BBOX
+from modules.perf import perf
+from modules.raster import RasterRenderer
+from modules.render import FrameRenderer, draw_basemap, render_frames
+
+# Part of every cached image key: bump when the look of the plots changes
+PLOT_STYLE = "contourf-jet-v2"
+MESH_STYLE = "mesh-jet-v1"
+RASTER_STYLE = "raster-jet-v1"
+
+def time_indexes(times):
+    """A count of time steps or an iterable of time indexes, as a list of indexes."""
+    return list(range(times)) if isinstance(times, int) else [int(t) for t in times]
+
+def raster_frames(variable, data, derived, times=None, bbox=DEFAULT_BBOX):
+    """Frames from the NumPy rasterizer, milliseconds each, so no process pool is needed."""
+    renderer = RasterRenderer(variable, data, derived, derived.zrange(variable), bbox=bbox)
+    for time_index in time_indexes(data.valid_time.size if times is None else times):
+        yield renderer.render(time_index)
+
+def mesh_renderer(variable, data, derived, bbox=DEFAULT_BBOX):
+    # Figure, basemap, colorbar and quiver are built once; frames only update the data
+    return FrameRenderer(variable, data, derived.levels(variable), derived=derived, mesh=True, bbox=bbox)
+
+def raster_renderer(variable, data, derived, bbox=DEFAULT_BBOX):
+    return RasterRenderer(variable, data, derived, derived.zrange(variable), bbox=bbox)
+
+def create_gif(variable, data, derived, frames_per_second=2, workers=None, fast=False,
+               times=None, bbox=DEFAULT_BBOX, fingerprint=None):
+    """
+    Create a GIF from time-stepped data, using the precomputed DerivedFields.
+    Frames are rendered in parallel worker processes (or by the NumPy rasterizer
+    when fast is set) and streamed in order to an incremental GIF writer, so only
+    a few frames are ever held in memory.
+    The GIF is stored in the artifact cache under a key of everything it depends on,
+    so repeated requests reuse it and concurrent sessions never share a file.
+    Returns the path to the generated GIF file.
+    """
+    indexes = time_indexes(data.valid_time.size if times is None else times)
+    key = artifact_key("gif", variable, bbox=bbox, fingerprint=fingerprint, fps=frames_per_second,
+                       style=RASTER_STYLE if fast else PLOT_STYLE, times=indexes)
+
+    @perf.timed("gif.write")
+    def write(gif_filename):
+        if fast:
+            frames = raster_frames(variable, data, derived, indexes, bbox=bbox)
+        else:
+            frames = render_frames(variable, derived.levels(variable), indexes, bbox=bbox, workers=workers)
+        # The GIF-PIL writer encodes each frame as it is appended instead of buffering them all
+        writer = imageio.get_writer(gif_filename, format="GIF-PIL", mode="I",
+                                    duration=1.0 / frames_per_second, loop=0)
+        with writer:
+            for frame in frames:
+                writer.append_data(frame)
+
+    return artifact_cache.get_or_create(key, "gif", write)
+
+def plot_figure(variable, lat, lon, data, derived, time_index, levels, bbox=DEFAULT_BBOX):
+    """Matplotlib contour plot (with wind arrows for Wind) of one time step."""
+    lon_min, lat_min, lon_max, lat_max = bbox
+    fig = plt.figure(figsize=(15, 8))
+    m = draw_basemap(llcrnrlon=lon_min, llcrnrlat=lat_min, urcrnrlon=lon_max, urcrnrlat=lat_max)
+    if variable == "Temperature":
+        cf = plt.contourf(lon, lat, derived.field(variable, time_index), levels=levels, cmap='jet', extend='both')
+        cb = plt.colorbar(cf, fraction=0.0235, pad=0.03)
+        cb.set_label(' °K', fontsize=15, rotation=0)
+    elif variable == "Wind":
+        wind_u = data.u10
+        wind_v = data.v10
+        cf = plt.contourf(lon, lat, derived.field(variable, time_index), levels=levels, cmap='jet')
+        Q = plt.quiver(lon[::6], lat[::6],
+                       wind_u[time_index, ::6, ::6],
+                       wind_v[time_index, ::6, ::6],
+                       scale_units='xy', scale=3, width=0.0015)
+        qk = plt.quiverkey(Q, 1, 1.04, 5,
+                           str(5) + ' m/s',
+                           labelpos='E', coordinates='axes')
+        cb = plt.colorbar(cf, fraction=0.0235, pad=0.03)
+        cb.set_label('m/s', fontsize=15)
+    return fig
+
+def plot_png(variable, lat, lon, data, derived, time_index, levels, fingerprint=None, bbox=DEFAULT_BBOX):
+    """PNG bytes of plot_figure, served from the artifact cache when rendered before."""
+    key = artifact_key("frame", variable, bbox=bbox, fingerprint=fingerprint, time_index=time_index, style=PLOT_STYLE)
+    png = artifact_cache.get_bytes(key, "png")
+    if png is None:
+        with perf.span("render.plot"):
+            fig = plot_figure(variable, lat, lon, data, derived, time_index, levels, bbox=bbox)
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png", bbox_inches="tight")
+            plt.close(fig)
+            png = buffer.getvalue()
+        artifact_cache.put_bytes(key, "png", png)
+    return png
+
+def frame_pngs(variable, times, style, make_renderer, fingerprint=None, bbox=DEFAULT_BBOX):
+    """
+    PNG bytes of every frame, from the artifact cache where possible. make_renderer()
+    is only called on the first missing frame, and that renderer is reused for the rest.
+    """
+    fingerprint = fingerprint or dataset_fingerprint()
+    renderer = None
+    for time_index in time_indexes(times):
+        key = artifact_key("frame", variable, bbox=bbox, fingerprint=fingerprint, time_index=time_index, style=style)
+        png = artifact_cache.get_bytes(key, "png")
+        if png is None:
+            renderer = renderer or make_renderer()
+            png = imageio.imwrite("<bytes>", renderer.render(time_index), format="png")
+            artifact_cache.put_bytes(key, "png", png)
+        yield png
@@ -0,0 +1,105 @@
+from dataclasses import dataclass
+
+import numpy as np
+import xarray as xr
+
+# Native grid spacing (degrees) of the ERA5 reanalysis served by the archive endpoint.
+# Requests closer together than this return the same model cell.
+ERA5_RESOLUTION = 0.25
+
+KM_PER_DEGREE = 111  # Approximate conversion from km to degrees
+
+# Hourly series packed into the grid cube
+HOURLY_VARIABLES = ("temperature_2m", "windspeed_10m", "winddirection_10m")
+
+def grid_axes(center_lat, center_lon, radius_km, num_points):
+    """Latitude and longitude axes of a num_points x num_points grid around the center."""
+    radius_deg = radius_km / KM_PER_DEGREE
+    latitudes = np.linspace(center_lat - radius_deg, center_lat + radius_deg, int(num_points))
+    longitudes = np.linspace(center_lon - radius_deg, center_lon + radius_deg, int(num_points))
+    return latitudes, longitudes
+
+def grid_points_array(center_lat, center_lon, radius_km, num_points):
+    """All grid points as an (N, 2) array of (lat, lon), latitude-major like the old list."""
+    latitudes, longitudes = grid_axes(center_lat, center_lon, radius_km, num_points)
+    lat, lon = np.meshgrid(latitudes, longitudes, indexing="ij")
+    return np.column_stack([lat.ravel(), lon.ravel()])
+
+@dataclass
+class SnappedGrid:
+    points: np.ndarray   # (N, 2) requested points
+    cells: np.ndarray    # (M, 2) unique snapped cells, M <= N
+    index: np.ndarray    # (N,) position of each requested point's cell in `cells`
+    resolution: float
+
+    def cell_keys(self):
+        """Unique cells as plain (lat, lon) float tuples, usable as cache/dict keys."""
+        return [(float(lat), float(lon)) for lat, lon in self.cells]
+
+    def point_keys(self):
+        """Snapped cell key of every requested point, in request order."""
+        keys = self.cell_keys()
+        return [keys[i] for i in self.index]
+
+    def broadcast(self, values):
+        """
+        Map per-cell results back onto the requested points. `values` is either a
+        dict keyed by cell_keys() (missing cells give None) or an array whose first
+        axis follows `cells`.
+        """
+        if isinstance(values, dict):
+            return [values.get(key) for key in self.point_keys()]
+        return np.asarray(values)[self.index]
+
+def snap_grid(points, resolution=ERA5_RESOLUTION):
+    """Snap points to the model grid and deduplicate them before any I/O happens."""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    # Round away floating point noise so equal cells compare equal
+    snapped = np.round(np.round(points / resolution) * resolution, 6)
+    cells, index = np.unique(snapped, axis=0, return_inverse=True)
+    return SnappedGrid(points=points, cells=cells, index=index.ravel(), resolution=resolution)
+
+def assemble_grid_dataset(weather_data, variables=HOURLY_VARIABLES):
+    """
+    Pack per-cell Open-Meteo responses ({(lat, lon): json}) into an xarray Dataset of
+    contiguous float32 (time, latitude, longitude) arrays on a shared time axis.
+    Cells or hours without data are NaN.
+    """
+    cells = [(cell, data) for cell, data in weather_data.items() if data and "hourly" in data]
+    if not cells:
+        return xr.Dataset(
+            {name: (("time", "latitude", "longitude"), np.empty((0, 0, 0), dtype=np.float32)) for name in variables},
+            coords={"time": np.array([], dtype="datetime64[ns]"), "latitude": [], "longitude": []},
+        )
+
+    latitudes = np.unique([cell[0] for cell, _ in cells])
+    longitudes = np.unique([cell[1] for cell, _ in cells])
+    lat_index = np.searchsorted(latitudes, [cell[0] for cell, _ in cells])
+    lon_index = np.searchsorted(longitudes, [cell[1] for cell, _ in cells])
+
+    # Parse the timestamps once; every cell normally shares the same series
+    first_times = cells[0][1]["hourly"]["time"]
+    if all(data["hourly"]["time"] == first_times for _, data in cells):
+        times = np.asarray(first_times, dtype="datetime64[ns]")
+        time_index = [slice(None)] * len(cells)
+    else:
+        per_cell = [np.asarray(data["hourly"]["time"], dtype="datetime64[ns]") for _, data in cells]
+        times = np.unique(np.concatenate(per_cell))
+        time_index = [np.searchsorted(times, cell_times) for cell_times in per_cell]
+
+    cube = np.full((len(variables), len(times), len(latitudes), len(longitudes)), np.nan, dtype=np.float32)
+    for k, (_, data) in enumerate(cells):
+        hourly = data["hourly"]
+        for v, name in enumerate(variables):
+            if name in hourly:
+                # dtype=float turns JSON nulls into NaN
+                cube[v, time_index[k], lat_index[k], lon_index[k]] = np.asarray(hourly[name], dtype=float)
+
+    units = cells[0][1].get("hourly_units", {})
+    return xr.Dataset(
+        {
+            name: (("time", "latitude", "longitude"), cube[v], {"units": units.get(name, "")})
+            for v, name in enumerate(variables)
+        },
+        coords={"time": times, "latitude": latitudes, "longitude": longitudes},
+    )
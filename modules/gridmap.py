@@ -0,0 +1,195 @@
+"""
+Animated deck.gl map of a fetched archive grid, for the Map - Grid page.
+
+The grid goes to the browser once, as raw float32 buffers (base64 in the HTML). The
+time slider then only points the layer at another slice of the value buffer, so
+playback and scrubbing never go back to the Streamlit server.
+"""
+import base64
+import json
+
+import numpy as np
+import pydeck as pdk
+
+from modules.grid import ERA5_RESOLUTION
+from modules.raster import JET_LUT
+
+DECK_GL_URL = "https://unpkg.com/deck.gl@9.0.38/dist.min.js"
+BASEMAP_TILES = "https://basemaps.cartocdn.com/light_all/{z}/{x}/{y}.png"
+
+# Grid variables worth a color scale (wind direction is an angle), with their labels
+GRID_VARIABLES = {"temperature_2m": "Temperature", "windspeed_10m": "Wind speed"}
+LAYERS = ("Columns", "Heatmap")
+# Height (m) of the tallest column
+MAX_ELEVATION = 20000
+MAX_ZOOM = 12
+
+def grid_buffers(grid, variable):
+    """
+    (positions, values, (vmin, vmax)) of the cells with any data: positions is (N, 2)
+    float32 lon/lat, values is (T, N) float32 scaled to [0, 1] over the whole series,
+    NaN where a cell has no value at that hour.
+    """
+    series = grid[variable].values.reshape(grid.time.size, -1)
+    lat, lon = np.meshgrid(grid.latitude.values, grid.longitude.values, indexing="ij")
+    keep = np.isfinite(series).any(axis=0)
+    series = series[:, keep]
+    positions = np.column_stack([lon.ravel()[keep], lat.ravel()[keep]]).astype(np.float32)
+    vmin, vmax = float(np.nanmin(series)), float(np.nanmax(series))
+    values = ((series - vmin) / max(vmax - vmin, 1e-12)).astype(np.float32)
+    return positions, values, (vmin, vmax)
+
+def cell_size(axis, default=ERA5_RESOLUTION):
+    """Smallest spacing (degrees) of a grid axis."""
+    steps = np.diff(np.unique(axis))
+    return float(steps.min()) if steps.size else default
+
+def _encode(array):
+    return base64.b64encode(np.ascontiguousarray(array).tobytes()).decode("ascii")
+
+def grid_map_html(grid, variable, layer="Columns", fps=4, height=600):
+    """Self-contained HTML (deck.gl from a CDN) of the grid variable with its own time slider."""
+    positions, values, (vmin, vmax) = grid_buffers(grid, variable)
+    view = pdk.data_utils.compute_view(positions.tolist())
+    # Cells are squares of the grid spacing; columns get a radius just under half of it
+    spacing = min(cell_size(grid.latitude.values), cell_size(grid.longitude.values))
+    config = {
+        "layer": layer,
+        "count": len(positions),
+        "positions": _encode(positions),
+        "values": _encode(values),
+        "times": [str(t)[:16].replace("T", " ") for t in grid.time.values],
+        "lut": JET_LUT.tolist(),
+        "colorRange": JET_LUT[::51].tolist(),
+        "range": [vmin, vmax],
+        "unit": grid[variable].attrs.get("units", ""),
+        "radius": spacing * 111_000 * 0.45,
+        "elevationScale": MAX_ELEVATION,
+        "fps": fps,
+        "tiles": BASEMAP_TILES,
+        "view": {
+            "latitude": view.latitude,
+            "longitude": view.longitude,
+            "zoom": min(view.zoom, MAX_ZOOM),
+            "pitch": 45 if layer == "Columns" else 0,
+            "bearing": 0,
+        },
+    }
+    return (GRID_MAP_TEMPLATE.replace("__DECK_GL_URL__", DECK_GL_URL)
+            .replace("__HEIGHT__", str(height))
+            .replace("__CONFIG__", json.dumps(config)))
+
+GRID_MAP_TEMPLATE = """
+<div id="map" style="position: relative; width: 100%; height: __HEIGHT__px;"></div>
+<div style="display: flex; align-items: center; gap: 8px; font-family: sans-serif; font-size: 14px; margin-top: 6px;">
+  <button id="play">Play</button>
+  <input id="time" type="range" min="0" value="0" step="1" style="flex: 1;">
+  <span id="label" style="min-width: 130px;"></span>
+  <span id="legend-min"></span>
+  <span id="legend" style="width: 120px; height: 12px;"></span>
+  <span id="legend-max"></span>
+</div>
+<script src="__DECK_GL_URL__"></script>
+<script>
+const config = __CONFIG__;
+const count = config.count;
+
+function decode(text) {
+  const bytes = Uint8Array.from(atob(text), c => c.charCodeAt(0));
+  return new Float32Array(bytes.buffer);
+}
+const positions = decode(config.positions);
+const values = decode(config.values);
+
+// Colors of every cell and hour, computed once; cells without data are transparent
+const colors = new Uint8Array(values.length * 4);
+for (let i = 0; i < values.length; i++) {
+  if (Number.isNaN(values[i])) {
+    values[i] = 0;
+    continue;
+  }
+  const rgb = config.lut[Math.round(values[i] * (config.lut.length - 1))];
+  colors.set(rgb, i * 4);
+  colors[i * 4 + 3] = 220;
+}
+
+const basemap = new deck.TileLayer({
+  id: "basemap",
+  data: config.tiles,
+  maxZoom: 19,
+  tileSize: 256,
+  renderSubLayers: props => {
+    const [[west, south], [east, north]] = props.tile.boundingBox;
+    return new deck.BitmapLayer(props, {data: null, image: props.data, bounds: [west, south, east, north]});
+  },
+});
+
+function gridLayer(step) {
+  // Views into the buffers of one time step: nothing is copied or recomputed per frame
+  const value = values.subarray(step * count, (step + 1) * count);
+  if (config.layer === "Heatmap") {
+    return new deck.HeatmapLayer({
+      id: "grid",
+      data: {length: count, attributes: {getPosition: {value: positions, size: 2}, getWeight: {value: value, size: 1}}},
+      aggregation: "MEAN",
+      colorDomain: [0, 1],
+      colorRange: config.colorRange,
+      radiusPixels: 40,
+    });
+  }
+  return new deck.ColumnLayer({
+    id: "grid",
+    data: {
+      length: count,
+      attributes: {
+        getPosition: {value: positions, size: 2},
+        getElevation: {value: value, size: 1},
+        getFillColor: {value: colors.subarray(step * count * 4, (step + 1) * count * 4), size: 4},
+      },
+    },
+    diskResolution: 4,
+    angle: 45,
+    radius: config.radius,
+    extruded: true,
+    elevationScale: config.elevationScale,
+  });
+}
+
+const map = new deck.Deck({
+  parent: document.getElementById("map"),
+  initialViewState: config.view,
+  controller: true,
+  layers: [basemap, gridLayer(0)],
+});
+
+const slider = document.getElementById("time");
+const label = document.getElementById("label");
+const play = document.getElementById("play");
+slider.max = config.times.length - 1;
+
+function show(step) {
+  slider.value = step;
+  label.textContent = config.times[step];
+  map.setProps({layers: [basemap, gridLayer(step)]});
+}
+slider.addEventListener("input", () => show(Number(slider.value)));
+
+let timer = null;
+play.addEventListener("click", () => {
+  if (timer !== null) {
+    clearInterval(timer);
+    timer = null;
+    play.textContent = "Play";
+    return;
+  }
+  play.textContent = "Pause";
+  timer = setInterval(() => show((Number(slider.value) + 1) % config.times.length), 1000 / config.fps);
+});
+
+const stops = config.colorRange.map(([r, g, b]) => "rgb(" + r + "," + g + "," + b + ")");
+document.getElementById("legend").style.background = "linear-gradient(to right, " + stops.join(", ") + ")";
+document.getElementById("legend-min").textContent = config.range[0].toFixed(1) + " " + config.unit;
+document.getElementById("legend-max").textContent = config.range[1].toFixed(1) + " " + config.unit;
+show(0);
+</script>
+"""
@@ -1,36 +1,30 @@
-import datetime
 import streamlit as st
-import requests
-import numpy as np
-import hashlib
 import os
-import json
 from modules.cache import cache_manager
-import asyncio
-import aiohttp
+from modules.fetch import fetch_engine
+from modules.perf import perf
+from modules.grid import ERA5_RESOLUTION, assemble_grid_dataset, grid_points_array, snap_grid
+# The archive fetch core lives in modules/archive.py (no Streamlit); these are its Streamlit wrappers
+from modules.archive import GRID_BATCH_SIZE, fetch_archive_cells, fetch_grid_sparse
 
 # global_url = "http://localhost:8080"
 
-def get_weather_forecast(latitude, longitude):
-    # Open Meteo API endpoint
-    url = f"https://api.open-meteo.com/v1/forecast"  # Use local server for testing
-    
-    # Parameters for the API
-    params = {
+# Open Meteo API endpoints, overridable to point at a local mock server
+FORECAST_URL = os.environ.get("OPEN_METEO_FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+
+def forecast_params(latitude, longitude):
+    return {
         "latitude": latitude,  # Fixed typo here
         "longitude": longitude,
         "hourly": "temperature_2m,windspeed_10m,winddirection_10m",  # Added winddirection_10m
         "daily": "temperature_2m_max,temperature_2m_min,windspeed_10m_max",
         "timezone": "auto"
     }
-    
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        # st.error("Error fetching data from Open Meteo API")
-        print("Error fetching data from Open Meteo API")
-        return None
+
+def get_weather_forecast(latitude, longitude):
+    # Goes through the shared fetch engine (pooled session, timeout, retry/backoff)
+    with perf.span("forecast.get"):
+        return fetch_engine.get_json(FORECAST_URL, forecast_params(latitude, longitude))
     
 def get_location():
     st.sidebar.subheader("Location")
@@ -40,77 +34,62 @@ def get_location():
     return {"latitude": latitude, "longitude": longitude}
 
 def generate_grid_points(center_lat, center_lon, radius_km, num_points):
-    radius_deg = radius_km / 111  # Approximate conversion from km to degrees
-    latitudes = np.linspace(center_lat - radius_deg, center_lat + radius_deg, num_points)
-    longitudes = np.linspace(center_lon - radius_deg, center_lon + radius_deg, num_points)
-    grid_points = [(lat, lon) for lat in latitudes for lon in longitudes]
-    return grid_points
-
-def fetch_weather_data_for_grid(grid_points):
-    weather_data = {}
+    # (N, 2) array of (lat, lon); iterating it still yields (lat, lon) pairs
+    return grid_points_array(center_lat, center_lon, radius_km, num_points)
+
+def streamlit_reporters():
+    """Progress bar and error callbacks for the archive fetch core, plus the bar itself."""
     progress_bar = st.progress(0)
-    total_points = len(grid_points)
-    completed_tasks = 0  # Initialize a counter for completed tasks
-
-    async def fetch(session, lat, lon):
-        nonlocal completed_tasks
-        lat = round(lat, 1)
-        lon = round(lon, 1)
-        cached_data = cache_manager.load(lat, lon)
-        if cached_data:
-            weather_data[(lat, lon)] = cached_data
-        else:
-            data = await get_weather_forecast_async(session, lat, lon)
-            if data:
-                weather_data[(lat, lon)] = data
-                cache_manager.save(data, lat, lon)
-        completed_tasks += 1
-        progress_bar.progress(completed_tasks / total_points)
-
-    async def get_weather_forecast_async(session, latitude, longitude):
-        url = "https://archive-api.open-meteo.com/v1/era5"
-        # Get start_date from the current date - 2 days
-        start_date = (datetime.datetime.now() - datetime.timedelta(days=2)).strftime("%Y-%m-%d")
-        params = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "start_date": start_date,
-            "end_date": start_date,
-            "hourly": "temperature_2m,windspeed_10m,winddirection_10m",
-            "daily": "rain_sum",
-            "timezone": "auto"
-        }
-        try:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    # Ensure 'temperature_2m' data is present
-                    if 'hourly' in data and 'temperature_2m' in data['hourly']:
-                        return data
-                    else:
-                        st.error(f"Temperature data missing for ({latitude}, {longitude})")
-                        return None
-                else:
-                    st.error("Error fetching data from Open Meteo API")
-                    return None
-        except Exception as e:
-            # st.error(f"Exception occurred: {e}")
-            print(f"Exception occurred: {e}")
-            return None
-
-    async def main():
-        async with aiohttp.ClientSession() as session:
-            tasks = [fetch(session, lat, lon) for lat, lon in grid_points]
-            await asyncio.gather(*tasks)
-        progress_bar.progress(1.0)  # Ensure the progress bar reaches 100%
-
-    asyncio.run(main())
 
+    def report(done, total):
+        progress_bar.progress(min(done / max(total, 1), 1.0))
+
+    def error(cell, message):
+        lat, lon = cell
+        st.error(f"{message} for ({lat}, {lon})")
+
+    return progress_bar, report, error
+
+def fetch_weather_data_for_grid(grid_points, batch_size=GRID_BATCH_SIZE, resolution=ERA5_RESOLUTION):
+    """
+    Fetch archive data for every grid point, with a progress bar. Points are first
+    snapped to the model resolution and deduplicated, so the cost depends on the
+    number of unique cells; see fetch_archive_cells for caching and batching.
+
+    Returns a dict keyed by snapped (lat, lon) cell; use
+    snap_grid(grid_points).broadcast(result) to get one entry per requested point.
+    """
+    # Callbacks run on the script thread, the only one allowed to update Streamlit elements
+    progress_bar, report, error = streamlit_reporters()
+    weather_data = fetch_archive_cells(snap_grid(grid_points, resolution).cell_keys(), batch_size,
+                                       on_progress=report, on_error=error)
+    progress_bar.progress(1.0)  # Ensure the progress bar reaches 100%
     return weather_data
 
-@st.cache_data
+def fetch_weather_grid_sparse(center_lat, center_lon, radius_km, num_points, control_points=5,
+                              method="bilinear", holdout_points=8):
+    """fetch_grid_sparse with a progress bar: (interpolated grid Dataset, held-out error DataFrame)."""
+    progress_bar, report, error = streamlit_reporters()
+    result = fetch_grid_sparse(center_lat, center_lon, radius_km, num_points, control_points, method,
+                               holdout_points, on_progress=report, on_error=error)
+    progress_bar.progress(1.0)
+    return result
+
+# The in-process memo expires with the archive cache entries, so the pages see the
+# moving date window and what the prewarmer refreshed
+GRID_MEMO_TTL = cache_manager.get_ttl("archive")
+
+@st.cache_data(ttl=GRID_MEMO_TTL)
 def fetch_weather_data_for_grid_cached(grid_points):
-    return fetch_weather_data_for_grid(grid_points)
+    # Cache the compact float32 cube rather than the raw JSON dict, so hits
+    # only unpickle a few contiguous arrays
+    return assemble_grid_dataset(fetch_weather_data_for_grid(grid_points))
+
+@st.cache_data(ttl=GRID_MEMO_TTL)
+def fetch_weather_grid_sparse_cached(center_lat, center_lon, radius_km, num_points, control_points=5,
+                                     method="bilinear", holdout_points=8):
+    return fetch_weather_grid_sparse(center_lat, center_lon, radius_km, num_points,
+                                     control_points, method, holdout_points)
 
 def save_user_config(latitude, longitude, radius_km, num_points):
     config = {
@@ -119,10 +98,10 @@ def save_user_config(latitude, longitude, radius_km, num_points):
         "radius_km": radius_km,
         "num_points": num_points
     }
-    cache_manager.save(config, "user_config")
+    cache_manager.save(config, "config", "user_config")
 
 def load_user_config():
-    config = cache_manager.load("user_config")
+    config = cache_manager.load("config", "user_config")
     if config:
         return config
     return None
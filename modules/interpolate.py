@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from modules.points import PointIndex
+
+# Angles in degrees: interpolated through their sin/cos components so 350° and 10° average to 0°
+CIRCULAR_VARIABLES = ("winddirection_10m",)
+
+METHODS = ("bilinear", "idw")
+
+def control_axes(latitudes, longitudes, control_points):
+    """Coarse lattice axes spanning the same extent as the dense axes."""
+    n = max(int(control_points), 2)
+    return (np.linspace(latitudes[0], latitudes[-1], n),
+            np.linspace(longitudes[0], longitudes[-1], n))
+
+def _components(name, values):
+    if name in CIRCULAR_VARIABLES:
+        radians = np.deg2rad(values)
+        return [np.sin(radians), np.cos(radians)]
+    return [values]
+
+def _combine(name, parts):
+    if name in CIRCULAR_VARIABLES:
+        # In float32, as stored: tiny negative angles round up to exactly 360
+        direction = (np.rad2deg(np.arctan2(parts[0], parts[1])) % 360).astype(np.float32)
+        return np.where(direction >= 360, 0, direction).astype(np.float32)
+    return parts[0]
+
+def bilinear_weights(lat_axis, lon_axis, lats, lons):
+    """Gather indices (4, K) and weights (4, K) of the control cells around each target."""
+    (lat0, lat1, wlat), (lon0, lon1, wlon) = PointIndex(lat_axis, lon_axis).bilinear(lats, lons)
+    lat_index = np.stack([lat0, lat0, lat1, lat1])
+    lon_index = np.stack([lon0, lon1, lon0, lon1])
+    weights = np.stack([(1 - wlat) * (1 - wlon), (1 - wlat) * wlon, wlat * (1 - wlon), wlat * wlon])
+    return lat_index, lon_index, weights
+
+def idw_weights(lat_axis, lon_axis, lats, lons, power=2):
+    """Inverse distance weights (M, K) of every control cell for every target."""
+    grid_lat, grid_lon = np.meshgrid(lat_axis, lon_axis, indexing="ij")
+    # Equirectangular distance: degrees of longitude shrink with latitude
+    scale = np.cos(np.deg2rad(np.mean(lat_axis)))
+    dy = grid_lat.ravel()[:, None] - lats[None, :]
+    dx = (grid_lon.ravel()[:, None] - lons[None, :]) * scale
+    distance = np.hypot(dx, dy)
+    exact = distance < 1e-9
+    with np.errstate(divide="ignore"):
+        weights = np.where(exact, 0, 1 / distance ** power)
+    # A target sitting on a control cell takes that cell's value
+    hit = exact.any(axis=0)
+    weights[:, hit] = exact[:, hit]
+    return weights / weights.sum(axis=0, keepdims=True)
+
+def interpolate_points(control, lats, lons, method="bilinear", power=2):
+    """
+    Interpolate a control Dataset of (time, latitude, longitude) arrays to arbitrary
+    points. Returns {variable: (time, K) float32 array}. NaN control values propagate.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    lat_axis = control.latitude.values
+    lon_axis = control.longitude.values
+    if method == "bilinear":
+        lat_index, lon_index, weights = bilinear_weights(lat_axis, lon_axis, lats, lons)
+    elif method == "idw":
+        weights = idw_weights(lat_axis, lon_axis, lats, lons, power)
+    else:
+        raise ValueError(f"Unknown interpolation method: {method}")
+
+    result = {}
+    for name, values in control.data_vars.items():
+        parts = []
+        for component in _components(name, values.values):
+            if method == "bilinear":
+                # (time, 4, K) corners, summed with their weights
+                parts.append(np.einsum("tck,ck->tk", component[:, lat_index, lon_index], weights))
+            else:
+                parts.append(component.reshape(len(component), -1) @ weights)
+        result[name] = _combine(name, parts).astype(np.float32)
+    return result
+
+def interpolate_grid(control, latitudes, longitudes, method="bilinear", power=2):
+    """Fill the dense latitudes x longitudes grid from the control lattice, as a Dataset."""
+    lat, lon = np.meshgrid(latitudes, longitudes, indexing="ij")
+    values = interpolate_points(control, lat.ravel(), lon.ravel(), method, power)
+    shape = (len(latitudes), len(longitudes))
+    return xr.Dataset(
+        {
+            name: (("time", "latitude", "longitude"), series.reshape(-1, *shape), control[name].attrs)
+            for name, series in values.items()
+        },
+        coords={"time": control.time.values, "latitude": latitudes, "longitude": longitudes},
+    )
+
+def holdout_error(control, holdout, method="bilinear", power=2):
+    """
+    Interpolation error at held-out fetched points. holdout maps (lat, lon) to a
+    Dataset of time series; returns one row per point and variable with MAE, RMSE and
+    max absolute error over time (angular difference for circular variables).
+    """
+    if not holdout:
+        return pd.DataFrame(columns=["latitude", "longitude", "variable", "mae", "rmse", "max_error"])
+    cells = list(holdout)
+    lats, lons = np.array(cells).T
+    predicted = interpolate_points(control, lats, lons, method, power)
+    rows = []
+    for k, cell in enumerate(cells):
+        observed = holdout[cell]
+        for name, series in predicted.items():
+            if name not in observed:
+                continue
+            truth = observed[name].reindex(time=control.time.values).values
+            error = series[:, k] - truth
+            if name in CIRCULAR_VARIABLES:
+                error = (error + 180) % 360 - 180
+            error = np.abs(error[~np.isnan(error)])
+            rows.append({
+                "latitude": cell[0],
+                "longitude": cell[1],
+                "variable": name,
+                "mae": float(error.mean()) if error.size else np.nan,
+                "rmse": float(np.sqrt((error ** 2).mean())) if error.size else np.nan,
+                "max_error": float(error.max()) if error.size else np.nan,
+            })
+    return pd.DataFrame(rows)
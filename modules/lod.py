@@ -0,0 +1,73 @@
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Roughly how many screen pixels one contour cell should cover
+PIXELS_PER_CELL = 6
+
+def block_mean(z, factor):
+    """Coarsen a 2D field by an integer factor, averaging factor x factor blocks (NaN-aware)."""
+    if factor <= 1:
+        return z
+    ny, nx = z.shape
+    pad_y, pad_x = -ny % factor, -nx % factor
+    padded = np.pad(z.astype(np.float32, copy=False), ((0, pad_y), (0, pad_x)), constant_values=np.nan)
+    blocks = padded.reshape(padded.shape[0] // factor, factor, padded.shape[1] // factor, factor)
+    with np.errstate(invalid="ignore"):
+        # All-NaN blocks (only possible in NaN regions) stay NaN
+        return np.nanmean(blocks, axis=(1, 3)).astype(np.float32)
+
+def block_mean_coords(coord, factor):
+    """Block centers of a 1D coordinate axis, matching block_mean."""
+    if factor <= 1:
+        return coord
+    pad = -len(coord) % factor
+    padded = np.pad(np.asarray(coord, dtype=float), (0, pad), constant_values=np.nan)
+    return np.nanmean(padded.reshape(-1, factor), axis=1)
+
+def lod_level(shape, width, height, pixels_per_cell=PIXELS_PER_CELL):
+    """Smallest power-of-two level whose cell count fits the figure size."""
+    target_cells = max((width / pixels_per_cell) * (height / pixels_per_cell), 1)
+    cells = shape[0] * shape[1]
+    if cells <= target_cells:
+        return 0
+    return math.ceil(math.log2(math.sqrt(cells / target_cells)))
+
+class LodPyramid:
+    """
+    Power-of-two level-of-detail pyramid over DerivedFields. Level k averages
+    2**k x 2**k blocks and is built from level k-1, so deeper levels are cheap.
+    Levels are cached per (variable, time index) with LRU eviction.
+    """
+    def __init__(self, derived, lat, lon, max_entries=512):
+        self.derived = derived
+        self.lat = np.asarray(lat)
+        self.lon = np.asarray(lon)
+        self.max_entries = max_entries
+        self._levels = OrderedDict()
+        self._lock = threading.Lock()
+
+    def coords(self, level):
+        """(lat, lon) axes of a level, coarsened the same way as the fields."""
+        lat, lon = self.lat, self.lon
+        for _ in range(level):
+            lat, lon = block_mean_coords(lat, 2), block_mean_coords(lon, 2)
+        return lat, lon
+
+    def field(self, variable, time_index, level):
+        if level <= 0:
+            return self.derived.field(variable, time_index)
+        key = (variable, time_index, level)
+        with self._lock:
+            z = self._levels.get(key)
+            if z is not None:
+                self._levels.move_to_end(key)
+                return z
+        z = block_mean(self.field(variable, time_index, level - 1), 2)
+        with self._lock:
+            self._levels[key] = z
+            if len(self._levels) > self.max_entries:
+                self._levels.popitem(last=False)
+        return z
@@ -0,0 +1,176 @@
+"""
+Lightweight timing spans and counters for the hot paths (network, cache I/O, data
+decoding, figure building, frame rendering).
+
+Every span is aggregated per process and per Streamlit session (the session id is a
+context variable, which also follows requests onto the fetch engine loop) and
+appended as one JSON line to PERF_LOG. Counters are only aggregated, they are bumped
+far too often to log each one. Set WEATHER_PERF_LOG to another path, or to an empty
+string to turn the log off.
+"""
+import atexit
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict, deque
+
+import numpy as np
+
+PERF_LOG = os.environ.get("WEATHER_PERF_LOG", ".cache/perf.jsonl")
+# Recent durations kept per span name, for the percentiles
+MAX_SAMPLES = 2000
+# Sessions whose aggregates are kept, least recently active dropped first
+MAX_SESSIONS = 100
+# Buffered log lines written at once, and the size at which the log is rotated
+FLUSH_EVERY = 200
+LOG_MAX_BYTES = 20 * 1024 * 1024
+
+_session = contextvars.ContextVar("perf_session", default=None)
+
+class _Aggregate:
+    def __init__(self):
+        self.samples = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+        self.calls = Counter()
+        self.total = Counter()
+        self.counters = Counter()
+
+    def add_span(self, name, ms):
+        self.samples[name].append(ms)
+        self.calls[name] += 1
+        self.total[name] += ms
+
+    def summary(self):
+        spans = {}
+        for name, samples in self.samples.items():
+            values = np.fromiter(samples, dtype=float)
+            p50, p90, p99 = np.percentile(values, [50, 90, 99]).tolist()
+            spans[name] = {
+                "count": self.calls[name],
+                "total_ms": self.total[name],
+                "p50_ms": p50,
+                "p90_ms": p90,
+                "p99_ms": p99,
+                "max_ms": float(values.max()),
+            }
+        return {"spans": spans, "counters": dict(self.counters)}
+
+class _Span:
+    """Context manager of PerfRecorder.span; a class, as it is cheaper than a generator."""
+    __slots__ = ("recorder", "name", "tags", "started")
+
+    def __init__(self, recorder, name, tags):
+        self.recorder = recorder
+        self.name = name
+        self.tags = tags
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self.tags
+
+    def __exit__(self, *exc_info):
+        self.recorder.record(self.name, time.perf_counter() - self.started, **self.tags)
+
+class PerfRecorder:
+    def __init__(self, log_path=PERF_LOG):
+        self.log_path = log_path
+        self.process = _Aggregate()
+        self._sessions = OrderedDict()
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def set_session(self, session_id):
+        """Attribute everything recorded from the current context (thread) to a session."""
+        _session.set(session_id)
+
+    def span(self, name, **tags):
+        """
+        Time the enclosed block. Tags end up in the log line, e.g. namespace or status;
+        the tags dict is what `with` yields, so the block can add to it.
+        """
+        return _Span(self, name, tags)
+
+    def timed(self, name):
+        """Decorator version of span."""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, name, seconds, **tags):
+        ms = seconds * 1000
+        session = _session.get()
+        with self._lock:
+            self.process.add_span(name, ms)
+            if session is not None:
+                self._session_aggregate(session).add_span(name, ms)
+            if self.log_path:
+                self._log(name, ms, tags, session)
+
+    def count(self, name, n=1):
+        if not n:
+            return
+        session = _session.get()
+        with self._lock:
+            self.process.counters[name] += n
+            if session is not None:
+                self._session_aggregate(session).counters[name] += n
+
+    def summary(self, session=None):
+        """Aggregates of one session (None: the whole process), see _Aggregate.summary."""
+        with self._lock:
+            if session is None:
+                return self.process.summary()
+            aggregate = self._sessions.get(session)
+            return aggregate.summary() if aggregate is not None else {"spans": {}, "counters": {}}
+
+    def current_session(self):
+        return _session.get()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _session_aggregate(self, session):
+        aggregate = self._sessions.get(session)
+        if aggregate is None:
+            aggregate = self._sessions[session] = _Aggregate()
+            if len(self._sessions) > MAX_SESSIONS:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session)
+        return aggregate
+
+    def _log(self, name, ms, tags, session):
+        # Encoded on flush, to keep the timed code paths cheap
+        self._buffer.append((time.time(), session, name, ms, tags))
+        if len(self._buffer) >= FLUSH_EVERY:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer or not self.log_path:
+            return
+        pid = os.getpid()
+        lines = "".join(
+            json.dumps({"ts": round(ts, 3), "pid": pid, "session": session, "name": name, "ms": round(ms, 3), **tags},
+                       default=str) + "\n"
+            for ts, session, name, ms, tags in self._buffer
+        )
+        self._buffer = []
+        try:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > LOG_MAX_BYTES:
+                os.replace(self.log_path, self.log_path + ".1")
+            with open(self.log_path, "a") as f:
+                f.write(lines)
+        except OSError as e:
+            print(f"Could not write the performance log: {e}")
+
+# Global recorder instance
+perf = PerfRecorder()
+atexit.register(perf.flush)
@@ -0,0 +1,65 @@
+import pandas as pd
+import streamlit as st
+
+from modules.artifacts import artifact_cache
+from modules.cache import DEFAULT_NAMESPACES, cache_manager
+from modules.perf import perf
+
+def span_table(summary):
+    """One row per span name, slowest total first."""
+    table = pd.DataFrame.from_dict(summary["spans"], orient="index")
+    if table.empty:
+        return table
+    return table.sort_values("total_ms", ascending=False)
+
+def hit_ratios(counters):
+    """Lookups and hit ratio per cache namespace, plus the artifact store, from the perf counters."""
+    rows = {}
+    for namespace in DEFAULT_NAMESPACES:
+        memory = counters.get(f"cache.{namespace}.memory_hits", 0)
+        disk = counters.get(f"cache.{namespace}.disk_hits", 0)
+        misses = counters.get(f"cache.{namespace}.misses", 0)
+        # Found but unusable: outlived the TTL, misses days of the archive window or
+        # was fetched with other request params
+        stale = counters.get(f"cache.{namespace}.expired", 0) + counters.get(f"cache.{namespace}.params_mismatch", 0)
+        lookups = memory + disk + misses
+        if lookups:
+            rows[namespace] = {"lookups": lookups, "memory_hits": memory, "disk_hits": disk,
+                               "stale": stale, "hit_ratio": (memory + disk - stale) / lookups}
+    hits, misses = counters.get("artifacts.hits", 0), counters.get("artifacts.misses", 0)
+    if hits + misses:
+        rows["artifacts"] = {"lookups": hits + misses, "memory_hits": 0, "disk_hits": hits,
+                             "stale": 0, "hit_ratio": hits / (hits + misses)}
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+def render():
+    if not st.sidebar.checkbox("Performance panel", help="Timings and cache hit ratios of the hot paths."):
+        return
+    with st.sidebar.expander("Performance", expanded=True):
+        scope = st.radio("Scope", ("This session", "Server process"), horizontal=True)
+        summary = perf.summary(perf.current_session() if scope == "This session" else None)
+
+        spans = span_table(summary)
+        if spans.empty:
+            st.write("Nothing recorded yet.")
+        else:
+            st.dataframe(spans, column_config={
+                "count": st.column_config.NumberColumn("Calls"),
+                **{name: st.column_config.NumberColumn(name.removesuffix("_ms") + " (ms)", format="%.1f")
+                   for name in ("total_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms")},
+            })
+
+        ratios = hit_ratios(summary["counters"])
+        if not ratios.empty:
+            st.dataframe(ratios, column_config={"hit_ratio": st.column_config.ProgressColumn(
+                "Hit ratio", min_value=0.0, max_value=1.0, format="%.2f")})
+
+        fetch = {name.removeprefix("fetch."): summary["counters"].get(name, 0)
+                 for name in ("fetch.retries", "fetch.failures", "fetch.shared")}
+        st.caption("Requests: {retries} retries, {failures} failures, {shared} shared in flight".format(**fetch))
+        stats = cache_manager.get_stats()
+        st.caption(f"Cache: {stats['memory_entries']} entries in memory, {stats['disk_entries']} on disk "
+                   f"({stats['disk_bytes'] / 2**20:.1f} MB), process hit ratio {stats['hit_ratio']:.2f}. "
+                   f"Artifacts: {artifact_cache.stats['hits']} hits, {artifact_cache.stats['misses']} misses.")
+        if perf.log_path:
+            st.caption(f"Every span is also logged to {perf.log_path}")
@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+import streamlit as st
+import xarray as xr
+
+from modules.dataset import TIME_DIM, dataset_paths, load_data
+from modules.store import load_index
+
+POINT_VARIABLES = ("t2m", "u10", "v10")
+
+class PointIndex:
+    """
+    Lookup of grid positions for arbitrary coordinates over the dataset's lat/lon axes.
+    The axes are sorted once, so every query is a vectorized searchsorted, whatever the
+    number of points or the axis order of the file.
+    """
+    def __init__(self, latitude, longitude):
+        self.lat = _Axis(latitude)
+        self.lon = _Axis(longitude)
+
+    def contains(self, lats, lons):
+        return self.lat.contains(lats) & self.lon.contains(lons)
+
+    def nearest(self, lats, lons):
+        """(lat index, lon index) of the closest grid cell of every point."""
+        return self.lat.nearest(lats), self.lon.nearest(lons)
+
+    def bilinear(self, lats, lons):
+        """Corner indices and weights: ((lat0, lat1, wlat), (lon0, lon1, wlon))."""
+        return self.lat.between(lats), self.lon.between(lons)
+
+class _Axis:
+    def __init__(self, coord):
+        coord = np.asarray(coord, dtype=float)
+        self.order = np.argsort(coord)
+        self.sorted = coord[self.order]
+
+    def contains(self, values):
+        return (values >= self.sorted[0]) & (values <= self.sorted[-1])
+
+    def nearest(self, values):
+        pos = np.clip(np.searchsorted(self.sorted, values), 1, len(self.sorted) - 1)
+        left, right = self.sorted[pos - 1], self.sorted[pos]
+        return self.order[np.where(values - left <= right - values, pos - 1, pos)]
+
+    def between(self, values):
+        values = np.clip(values, self.sorted[0], self.sorted[-1])
+        pos = np.clip(np.searchsorted(self.sorted, values, side="right"), 1, len(self.sorted) - 1)
+        left, right = self.sorted[pos - 1], self.sorted[pos]
+        weight = (values - left) / np.where(right > left, right - left, 1)
+        return self.order[pos - 1], self.order[pos], weight
+
+def _take(data, variable, lat_index, lon_index):
+    """(point, time) float32 values of a variable at the given grid cells, one vectorized read."""
+    values = data[variable].isel(
+        latitude=xr.DataArray(lat_index, dims="point"),
+        longitude=xr.DataArray(lon_index, dims="point"),
+    )
+    return np.asarray(values.transpose("point", TIME_DIM).values, dtype=np.float32)
+
+def query_points(data, index, lats, lons, method="nearest", variables=POINT_VARIABLES):
+    """
+    Full time series of `variables` at many points at once, as a Dataset of
+    (point, valid_time) arrays. method is "nearest" (closest grid cell) or "bilinear"
+    (weighted mean of the four surrounding cells). Points outside the grid are NaN.
+    """
+    lats = np.atleast_1d(np.asarray(lats, dtype=float))
+    lons = np.atleast_1d(np.asarray(lons, dtype=float))
+    inside = index.contains(lats, lons)
+
+    if method == "nearest":
+        lat_index, lon_index = index.nearest(lats, lons)
+        series = {name: _take(data, name, lat_index, lon_index) for name in variables}
+    elif method == "bilinear":
+        (lat0, lat1, wlat), (lon0, lon1, wlon) = index.bilinear(lats, lons)
+        # Fetch all four corners in a single read per variable
+        corner_lat = np.concatenate([lat0, lat0, lat1, lat1])
+        corner_lon = np.concatenate([lon0, lon1, lon0, lon1])
+        weights = np.concatenate([(1 - wlat) * (1 - wlon), (1 - wlat) * wlon, wlat * (1 - wlon), wlat * wlon])
+        weights = weights.astype(np.float32).reshape(4, -1, 1)
+        series = {}
+        for name in variables:
+            corners = _take(data, name, corner_lat, corner_lon).reshape(4, len(lats), -1)
+            series[name] = (corners * weights).sum(axis=0)
+    else:
+        raise ValueError(f"Unknown interpolation method: {method}")
+
+    for values in series.values():
+        values[~inside] = np.nan
+    return xr.Dataset(
+        {name: (("point", TIME_DIM), values, data[name].attrs) for name, values in series.items()},
+        coords={TIME_DIM: data[TIME_DIM].values, "latitude": ("point", lats), "longitude": ("point", lons)},
+    )
+
+def query_point(data, index, lat, lon, method="nearest", variables=POINT_VARIABLES):
+    """Time series at a single point, as a Dataset of valid_time arrays."""
+    return query_points(data, index, [lat], [lon], method, variables).isel(point=0)
+
+def local_data_available():
+    """True when the map dataset (NetCDF files or the array store) is on disk."""
+    return load_index() is not None or any(os.path.exists(path) for path in dataset_paths())
+
+@st.cache_resource
+def load_point_index():
+    # Built once per process over the map dataset
+    data = load_data()
+    return PointIndex(data.latitude.values, data.longitude.values)
@@ -0,0 +1,88 @@
+import atexit
+import asyncio
+import threading
+import time
+
+from modules.cache import cache_manager
+from modules.fetch import FetchEngine
+from modules.grid import snap_grid, grid_points_array
+from modules.archive import (
+    GRID_BATCH_SIZE, archive_batches, fetch_archive_batch, plan_archive_fetch, store_archive_results,
+)
+
+class CachePrewarmer:
+    """
+    Background worker that keeps the archive cache warm for every saved grid config.
+
+    Runs in its own daemon thread and fetches through a private FetchEngine (own
+    event loop, low concurrency) so it never competes with interactive requests for
+    the shared engine, while reading and writing the same CacheManager. Every
+    `interval` seconds it plans the cells of each saved config like the foreground
+    fetch does and downloads whatever is missing, behind the current date window or
+    would expire before the next pass.
+    """
+    def __init__(self, cache, interval=10 * 60, max_in_flight=2, batch_size=GRID_BATCH_SIZE):
+        self.cache = cache
+        self.interval = interval
+        self.batch_size = batch_size
+        self.engine = FetchEngine(max_in_flight=max_in_flight)
+        self.last_run = None
+        self.last_refreshed = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Start the worker thread; calling it again (e.g. on every rerun) is a no-op."""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="cache-prewarmer", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def saved_configs(self):
+        """Every grid config stored in the config namespace."""
+        configs = []
+        for key in self.cache.backend.keys("config"):
+            config = self.cache.load("config", key)
+            if isinstance(config, dict) and {"latitude", "longitude", "radius_km", "num_points"} <= config.keys():
+                configs.append(config)
+        return configs
+
+    def refresh(self):
+        """Run one pre-warming pass and return the number of refreshed cells."""
+        cells = {}
+        for config in self.saved_configs():
+            points = grid_points_array(config["latitude"], config["longitude"], config["radius_km"], config["num_points"])
+            cells.update(dict.fromkeys(snap_grid(points).cell_keys()))
+        # Replan everything that would expire before the next pass
+        _, requests = plan_archive_fetch(list(cells), refresh_margin=self.interval, cache=self.cache)
+        batches = archive_batches(requests, self.batch_size)
+
+        async def run_batches():
+            return await asyncio.gather(*(
+                fetch_archive_batch([request.fetch_params for request in batch], engine=self.engine)
+                for batch in batches
+            ))
+
+        refreshed = 0
+        for batch, results in zip(batches, self.engine.run(run_batches()) if batches else []):
+            refreshed += len(store_archive_results(batch, results, cache=self.cache))
+        self.last_run = time.time()
+        self.last_refreshed = refreshed
+        return refreshed
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Cache pre-warming failed: {e}")
+            self._stop.wait(self.interval)
+
+cache_prewarmer = CachePrewarmer(cache_manager)
+atexit.register(cache_prewarmer.engine.close)
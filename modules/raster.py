@@ -0,0 +1,152 @@
+import functools
+
+import numpy as np
+
+from modules.dataset import DEFAULT_BBOX
+from modules.perf import perf
+
+# Output resolution of raster frames
+PIXELS_PER_DEGREE = 20
+
+NAN_COLOR = (255, 255, 255)
+LINE_COLOR = (0, 0, 0)
+
+# Breakpoints (x, value) of matplotlib's 'jet' colormap, so frames match the contour plots
+JET_SEGMENTS = (
+    ((0, 0), (0.35, 0), (0.66, 1), (0.89, 1), (1, 0.5)),
+    ((0, 0), (0.125, 0), (0.375, 1), (0.64, 1), (0.91, 0), (1, 0)),
+    ((0, 0.5), (0.11, 1), (0.34, 1), (0.65, 0), (1, 0)),
+)
+
+def jet_lut(size=256):
+    """The 'jet' colormap as a (size, 3) uint8 lookup table, computed in NumPy."""
+    x = np.linspace(0, 1, size)
+    rgb = np.stack([np.interp(x, *zip(*segments)) for segments in JET_SEGMENTS], axis=1)
+    return (rgb * 255).round().astype(np.uint8)
+
+JET_LUT = jet_lut()
+
+def colorize(field, vmin, vmax, lut=JET_LUT):
+    """Map a 2D field to RGB through the LUT; NaN cells get NAN_COLOR."""
+    scale = (len(lut) - 1) / max(vmax - vmin, 1e-12)
+    index = np.clip(np.nan_to_num((field - vmin) * scale), 0, len(lut) - 1).astype(np.intp)
+    rgb = lut[index]
+    missing = np.isnan(field)
+    if missing.any():
+        rgb[missing] = NAN_COLOR
+    return rgb
+
+def frame_shape(bbox, pixels_per_degree=PIXELS_PER_DEGREE):
+    lon_min, lat_min, lon_max, lat_max = bbox
+    return (int(round((lat_max - lat_min) * pixels_per_degree)),
+            int(round((lon_max - lon_min) * pixels_per_degree)))
+
+def pixel_index(coord, low, high, size, flip=False):
+    """Nearest grid index along one axis for every output pixel center."""
+    centers = low + (np.arange(size) + 0.5) * (high - low) / size
+    if flip:
+        centers = centers[::-1]
+    coord = np.asarray(coord)
+    order = np.argsort(coord)
+    pos = np.clip(np.searchsorted(coord[order], centers), 1, len(coord) - 1)
+    left, right = coord[order][pos - 1], coord[order][pos]
+    nearest = np.where(centers - left <= right - centers, pos - 1, pos)
+    return order[nearest]
+
+def _line_pixels(x0, y0, x1, y1, shape):
+    """Pixels (rows, cols) on straight segments, sampled densely enough to leave no gaps."""
+    x0, y0, x1, y1 = (np.asarray(a, dtype=float).ravel() for a in (x0, y0, x1, y1))
+    steps = int(np.ceil(np.nanmax(np.hypot(x1 - x0, y1 - y0), initial=0))) + 1
+    t = np.linspace(0, 1, steps)[None, :]
+    cols = np.rint(x0[:, None] + (x1 - x0)[:, None] * t).astype(int).ravel()
+    rows = np.rint(y0[:, None] + (y1 - y0)[:, None] * t).astype(int).ravel()
+    inside = (rows >= 0) & (rows < shape[0]) & (cols >= 0) & (cols < shape[1])
+    return rows[inside], cols[inside]
+
+@functools.lru_cache(maxsize=8)
+def coastline_mask(bbox=DEFAULT_BBOX, pixels_per_degree=PIXELS_PER_DEGREE, resolution='i'):
+    """
+    Boolean (H, W) mask of coastlines and country borders, rasterized once per bbox.
+    Basemap is only used here to read the line data, never to draw frames.
+    """
+    from mpl_toolkits.basemap import Basemap
+
+    lon_min, lat_min, lon_max, lat_max = bbox
+    shape = frame_shape(bbox, pixels_per_degree)
+    m = Basemap(projection='cyl', llcrnrlon=lon_min, llcrnrlat=lat_min,
+                urcrnrlon=lon_max, urcrnrlat=lat_max, resolution=resolution)
+    # Border segments are only loaded lazily by drawcountries(), read them the same way
+    country_segments, _ = m._readboundarydata('countries')
+    mask = np.zeros(shape, dtype=bool)
+    for segments in (m.coastsegs, country_segments):
+        for segment in segments:
+            points = np.asarray(segment, dtype=float)
+            if len(points) < 2:
+                continue
+            cols = (points[:, 0] - lon_min) * pixels_per_degree
+            rows = (lat_max - points[:, 1]) * pixels_per_degree
+            r, c = _line_pixels(cols[:-1], rows[:-1], cols[1:], rows[1:], shape)
+            mask[r, c] = True
+    return mask
+
+def arrow_pixels(u, v, rows, cols, shape, max_length):
+    """
+    Pixels of arrow glyphs (shaft plus two head strokes) for all wind vectors at once.
+    Arrow length is proportional to speed, the fastest one being max_length pixels.
+    """
+    speed = np.hypot(u, v)
+    top = np.nanmax(speed, initial=0)
+    if not top:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    length = np.nan_to_num(speed / top * max_length)
+    angle = np.arctan2(-v, u)  # image rows grow downwards
+    tip_x = cols + np.cos(angle) * length
+    tip_y = rows + np.sin(angle) * length
+    head = np.maximum(length * 0.35, 1.5)
+    x0 = [cols, tip_x, tip_x]
+    y0 = [rows, tip_y, tip_y]
+    x1 = [tip_x, tip_x + np.cos(angle + 2.6) * head, tip_x + np.cos(angle - 2.6) * head]
+    y1 = [tip_y, tip_y + np.sin(angle + 2.6) * head, tip_y + np.sin(angle - 2.6) * head]
+    return _line_pixels(np.concatenate(x0), np.concatenate(y0), np.concatenate(x1), np.concatenate(y1), shape)
+
+class RasterRenderer:
+    """
+    Fast, matplotlib-free frame renderer: field -> LUT colors -> nearest-neighbour
+    upsampling -> coastline overlay -> decimated wind arrows, all array operations.
+    Index maps and the coastline mask are computed once per renderer.
+    """
+    def __init__(self, variable, data, derived, zrange, bbox=DEFAULT_BBOX,
+                 pixels_per_degree=PIXELS_PER_DEGREE, arrow_step=6):
+        self.variable = variable
+        self.data = data
+        self.derived = derived
+        self.zrange = zrange
+        self.shape = frame_shape(bbox, pixels_per_degree)
+        lon_min, lat_min, lon_max, lat_max = bbox
+
+        lat = data.latitude.values
+        lon = data.longitude.values
+        self.row_index = pixel_index(lat, lat_min, lat_max, self.shape[0], flip=True)
+        self.col_index = pixel_index(lon, lon_min, lon_max, self.shape[1])
+        self.mask = coastline_mask(tuple(bbox), pixels_per_degree)
+
+        # Arrow anchors: every arrow_step-th grid point, in pixel coordinates
+        self.arrow_step = arrow_step
+        arrow_lat, arrow_lon = np.meshgrid(lat[::arrow_step], lon[::arrow_step], indexing="ij")
+        self.arrow_rows = (lat_max - arrow_lat) * pixels_per_degree
+        self.arrow_cols = (arrow_lon - lon_min) * pixels_per_degree
+        self.arrow_length = abs(lat[1] - lat[0]) * arrow_step * pixels_per_degree * 0.9 if len(lat) > 1 else 10
+
+    @perf.timed("render.raster")
+    def render(self, time_index):
+        field = self.derived.field(self.variable, time_index)
+        cells = colorize(field, *self.zrange)
+        frame = cells[self.row_index[:, None], self.col_index[None, :]]
+        frame[self.mask] = LINE_COLOR
+        if self.variable == "Wind":
+            step = self.arrow_step
+            u = np.asarray(self.data.u10[time_index, ::step, ::step], dtype=np.float32)
+            v = np.asarray(self.data.v10[time_index, ::step, ::step], dtype=np.float32)
+            rows, cols = arrow_pixels(u, v, self.arrow_rows, self.arrow_cols, self.shape, self.arrow_length)
+            frame[rows, cols] = LINE_COLOR
+        return frame
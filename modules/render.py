@@ -0,0 +1,171 @@
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib import colormaps as plt_colormaps
+from matplotlib.colors import BoundaryNorm
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from mpl_toolkits.basemap import Basemap
+
+from modules.dataset import DEFAULT_BBOX, open_map_data
+from modules.derived import DerivedFields
+from modules.perf import perf
+
+def draw_basemap(ax=None, llcrnrlon=90, llcrnrlat=-10, urcrnrlon=140, urcrnrlat=30, resolution='i'):
+    m = Basemap(projection='cyl',
+                llcrnrlon=llcrnrlon,
+                llcrnrlat=llcrnrlat,
+                urcrnrlon=urcrnrlon,
+                urcrnrlat=urcrnrlat,
+                resolution=resolution,
+                ax=ax)
+    m.drawcoastlines(1)
+    m.drawcountries()
+    parallels = np.arange(-15, 15 + 0.25, 5)
+    m.drawparallels(parallels, labels=[1, 0, 0, 0], linewidth=0.5)
+    meridians = np.arange(90, 150 + 0.25, 10)
+    m.drawmeridians(meridians, labels=[0, 0, 0, 1], linewidth=0.5)
+    return m
+
+class FrameRenderer:
+    """
+    Renders map_old style frames (contourf + wind quiver over a Basemap, with colorbar
+    and quiver key) to RGB arrays.
+
+    The figure, Basemap, colorbar, quiver and quiver key are built once and the static
+    part of the canvas is saved as a background. Each frame restores that background and
+    redraws only the data: the field (a new contour set, or with mesh=True a pcolormesh
+    updated in place with set_array), the quiver via set_UVC, and the coastlines on top.
+    Pixels come straight from the Agg canvas without a PNG encode/decode round trip,
+    cropped like savefig(bbox_inches="tight") to the axes, colorbar and labels.
+    """
+    def __init__(self, variable, data, levels, figsize=(15, 8), dpi=100, derived=None, mesh=False,
+                 bbox=DEFAULT_BBOX):
+        self.variable = variable
+        self.data = data
+        self.levels = levels
+        self.mesh = mesh
+        self.lat = data.latitude.values
+        self.lon = data.longitude.values
+        # One time step per chunk: workers render scattered time indexes
+        self.derived = derived or DerivedFields(data, chunk_size=1, max_chunks=1)
+        self.extend = 'both' if variable == "Temperature" else 'neither'
+
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+        lon_min, lat_min, lon_max, lat_max = bbox
+        self.basemap = draw_basemap(ax=self.ax, llcrnrlon=lon_min, llcrnrlat=lat_min,
+                                    urcrnrlon=lon_max, urcrnrlat=lat_max)
+        # Coastlines, borders and grid lines are drawn over the field again on every frame
+        self._overlay = list(self.ax.collections) + list(self.ax.lines)
+
+        field = self.derived.field(variable, 0)
+        if mesh:
+            norm = BoundaryNorm(levels, plt_colormaps['jet'].N, extend=self.extend)
+            self.field_artist = self.ax.pcolormesh(self.lon, self.lat, field, cmap='jet', norm=norm, shading='auto')
+        else:
+            self.field_artist = self._contour(field)
+        colorbar = self.fig.colorbar(self.field_artist, ax=self.ax, fraction=0.0235, pad=0.03)
+        self.quiver = None
+        if variable == "Temperature":
+            colorbar.set_label(' \u00b0K', fontsize=15, rotation=0)
+        else:
+            colorbar.set_label('m/s', fontsize=15)
+            self.quiver = self.ax.quiver(
+                self.lon[::6],
+                self.lat[::6],
+                *self._wind(0),
+                scale_units='xy',
+                scale=3,
+                width=0.0015
+            )
+            self.ax.quiverkey(self.quiver, 1, 1.04, 5, str(5) + ' m/s', labelpos='E', coordinates='axes')
+        self.fig.tight_layout()
+
+        # Background: everything except the per-frame artists
+        dynamic = [a for a in (self.field_artist, self.quiver) if a is not None]
+        for artist in dynamic:
+            artist.set_visible(False)
+        self.fig.canvas.draw()
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        for artist in dynamic:
+            artist.set_visible(True)
+        self._crop = self._tight_crop()
+
+    def _tight_crop(self, pad_inches=0.1):
+        """Row and column slices of the canvas buffer inside the tight bounding box."""
+        bbox = self.fig.get_tightbbox(self.fig.canvas.get_renderer()).padded(pad_inches)
+        dpi = self.fig.dpi
+        width, height = self.fig.canvas.get_width_height()
+        # Buffer rows run top to bottom, figure coordinates bottom to top
+        x0, x1 = max(int(np.floor(bbox.x0 * dpi)), 0), min(int(np.ceil(bbox.x1 * dpi)), width)
+        y0, y1 = max(int(np.floor(bbox.y0 * dpi)), 0), min(int(np.ceil(bbox.y1 * dpi)), height)
+        return slice(height - y1, height - y0), slice(x0, x1)
+
+    def _contour(self, field):
+        return self.ax.contourf(self.lon, self.lat, field, levels=self.levels, cmap='jet', extend=self.extend)
+
+    def _wind(self, time_index):
+        return (np.asarray(self.data.u10[time_index, ::6, ::6]),
+                np.asarray(self.data.v10[time_index, ::6, ::6]))
+
+    @perf.timed("render.frame")
+    def render(self, time_index):
+        field = self.derived.field(self.variable, time_index)
+        if self.mesh:
+            self.field_artist.set_array(field)
+        else:
+            self.field_artist.remove()
+            self.field_artist = self._contour(field)
+        if self.quiver is not None:
+            self.quiver.set_UVC(*self._wind(time_index))
+
+        canvas = self.fig.canvas
+        canvas.restore_region(self._background)
+        self.ax.draw_artist(self.field_artist)
+        for artist in self._overlay:
+            self.ax.draw_artist(artist)
+        if self.quiver is not None:
+            self.ax.draw_artist(self.quiver)
+        rows, cols = self._crop
+        return np.asarray(canvas.buffer_rgba())[rows, cols, :3].copy()
+
+# Per-process renderer of the pool workers
+_worker_renderer = None
+
+def _init_worker(variable, levels, bbox):
+    global _worker_renderer
+    _worker_renderer = FrameRenderer(variable, open_map_data(bbox), levels, bbox=bbox)
+
+def _render_in_worker(time_index):
+    return _worker_renderer.render(time_index)
+
+def render_frames(variable, levels, times, bbox=DEFAULT_BBOX, workers=None):
+    """
+    Yield RGB frames for every time index (times is a count or a list of indexes), in order. Frames are rendered by a pool of
+    worker processes that each open the data and build their Basemap once; at most
+    two frames per worker are pending, so memory stays flat however long the series.
+    """
+    indexes = list(range(times)) if isinstance(times, int) else list(times)
+    workers = min(workers or os.cpu_count() or 1, len(indexes))
+    if workers <= 1:
+        renderer = FrameRenderer(variable, open_map_data(bbox), levels, bbox=bbox)
+        for time_index in indexes:
+            yield renderer.render(time_index)
+        return
+
+    # spawn: the Streamlit server process runs background threads, which fork does not mix with
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(variable, levels, bbox)) as pool:
+        pending = deque()
+        for time_index in indexes:
+            pending.append(pool.submit(_render_in_worker, time_index))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,79 @@
+import datetime
+
+DATE_FORMAT = "%Y-%m-%d"
+
+def series_time_range(data):
+    """
+    (first, last) date of the hourly series in an Open-Meteo response, or None. ERA5
+    hours near the lag boundary come back as null: the range ends with the last day
+    whose hours all have values, so later days are requested again.
+    """
+    hourly = (data or {}).get("hourly", {})
+    times = hourly.get("time") or []
+    columns = [values for name, values in hourly.items() if name != "time"]
+    complete = [i for i in range(len(times)) if all(values[i] is not None for values in columns)]
+    if not complete:
+        return None
+    last = complete[-1]
+    last_day = times[last][:10]
+    if last + 1 < len(times) and times[last + 1][:10] == last_day:
+        # Null hours later that day: it is not covered yet
+        last_day = (datetime.date.fromisoformat(last_day) - datetime.timedelta(days=1)).strftime(DATE_FORMAT)
+    if last_day < times[0][:10]:
+        return None
+    return [times[0][:10], last_day]
+
+def missing_window(covered, wanted):
+    """
+    Dates of `wanted` = [start, end] not covered by `covered` (both inclusive,
+    "YYYY-MM-DD"). Returns None when everything is covered, otherwise the smallest
+    single [start, end] window that contains every missing day.
+    """
+    if covered is None:
+        return list(wanted)
+    start, end = (datetime.datetime.strptime(d, DATE_FORMAT).date() for d in wanted)
+    have_start, have_end = (datetime.datetime.strptime(d, DATE_FORMAT).date() for d in covered)
+    if have_end < start or have_start > end:
+        # No overlap, the cached series is of no use
+        return list(wanted)
+    one_day = datetime.timedelta(days=1)
+    before = (start, have_start - one_day) if start < have_start else None
+    after = (have_end + one_day, end) if have_end < end else None
+    if before is None and after is None:
+        return None
+    missing_start = (before or after)[0]
+    missing_end = (after or before)[1]
+    return [missing_start.strftime(DATE_FORMAT), missing_end.strftime(DATE_FORMAT)]
+
+def _merge_block(old, new, key, window):
+    """Merge two column blocks ({"time": [...], var: [...]}) by timestamp, new wins."""
+    old = old or {}
+    new = new or {}
+    columns = [c for c in dict.fromkeys([*old.keys(), *new.keys()]) if c != key]
+    rows = {}
+    for block in (old, new):
+        for i, t in enumerate(block.get(key, [])):
+            row = rows.setdefault(t, {})
+            for c in columns:
+                if c in block:
+                    row[c] = block[c][i]
+    start, end = window
+    times = sorted(t for t in rows if start <= t[:10] <= end)
+    merged = {key: times}
+    for c in columns:
+        merged[c] = [rows[t].get(c) for t in times]
+    return merged
+
+def merge_series(old, new, window):
+    """
+    Merge a freshly fetched response into a cached one and trim both the hourly and
+    daily series to `window`, so stored history only spans the requested dates.
+    """
+    if not old:
+        merged = dict(new)
+    else:
+        merged = {**old, **{k: v for k, v in new.items() if k not in ("hourly", "daily")}}
+    for block in ("hourly", "daily"):
+        if block in merged or block in new:
+            merged[block] = _merge_block((old or {}).get(block), new.get(block), "time", window)
+    return merged
@@ -0,0 +1,143 @@
+"""
+Memory-mapped array store for the map dataset: one raw float32 (time, lat, lon) .npy
+per variable plus an index.json of coordinates. Build it with `python -m modules.store`.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import xarray as xr
+
+from modules.dataset import DEFAULT_BBOX, TIME_DIM, dataset_paths, open_data
+
+STORE_DIR = './dataset/store'
+INDEX_FILE = 'index.json'
+STORE_VARIABLES = ("t2m", "u10", "v10")
+
+def source_fingerprint(paths):
+    """Identify the source files by name, size and modification time."""
+    fingerprint = []
+    for path in paths:
+        stat = os.stat(path)
+        fingerprint.append({"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime})
+    return fingerprint
+
+def ingest(paths=None, output=STORE_DIR, bbox=DEFAULT_BBOX, chunk_size=24):
+    """
+    Convert the NetCDF files into the store, one time chunk at a time. The new store
+    is built in a sibling directory and swapped in at the end, so processes that
+    still map the old arrays keep reading them unchanged.
+    """
+    paths = paths or dataset_paths()
+    data = open_data(paths, bbox=bbox)
+    output = os.path.normpath(output)
+    parent = os.path.dirname(output) or "."
+    os.makedirs(parent, exist_ok=True)
+    building = tempfile.mkdtemp(prefix=".store-", dir=parent)
+    try:
+        index = _write_store(data, paths, building, bbox, chunk_size)
+    except BaseException:
+        shutil.rmtree(building, ignore_errors=True)
+        raise
+    _swap_in(building, output)
+    return index
+
+def _write_store(data, paths, output, bbox, chunk_size):
+    variables = {}
+    for name in STORE_VARIABLES:
+        source = data[name]
+        filename = f"{name}.npy"
+        target = np.lib.format.open_memmap(
+            os.path.join(output, filename), mode="w+", dtype=np.float32, shape=source.shape
+        )
+        for start in range(0, source.shape[0], chunk_size):
+            target[start:start + chunk_size] = source[start:start + chunk_size].values
+        target.flush()
+        del target
+        variables[name] = {
+            "file": filename,
+            "dims": list(source.dims),
+            "attrs": {k: str(v) for k, v in source.attrs.items()},
+        }
+
+    index = {
+        "variables": variables,
+        "coords": {
+            TIME_DIM: [str(t) for t in data[TIME_DIM].values.astype("datetime64[ns]")],
+            "latitude": data.latitude.values.tolist(),
+            "longitude": data.longitude.values.tolist(),
+        },
+        "bbox": list(bbox) if bbox else None,
+        "sources": source_fingerprint(paths),
+    }
+    # Written last, so a store without an index is never picked up half-built
+    with open(os.path.join(output, INDEX_FILE), 'w') as f:
+        json.dump(index, f)
+    return index
+
+def _swap_in(building, output):
+    """Move the built store to output; the old one is renamed away first, then deleted."""
+    os.chmod(building, 0o755)
+    old = None
+    if os.path.exists(output):
+        old = f"{output}.old-{os.getpid()}"
+        os.replace(output, old)
+    os.replace(building, output)
+    if old is not None:
+        # Open memory maps keep the unlinked files alive until they are closed
+        shutil.rmtree(old, ignore_errors=True)
+
+def load_index(path=STORE_DIR):
+    index_file = os.path.join(path, INDEX_FILE)
+    if not os.path.exists(index_file):
+        return None
+    with open(index_file, 'r') as f:
+        return json.load(f)
+
+def store_is_fresh(path=STORE_DIR, paths=None, bbox=None):
+    """True when the store exists, covers bbox and was built from the current source files."""
+    index = load_index(path)
+    if index is None:
+        return False
+    if bbox is not None and index["bbox"] is not None:
+        lon_min, lat_min, lon_max, lat_max = index["bbox"]
+        if bbox[0] < lon_min or bbox[1] < lat_min or bbox[2] > lon_max or bbox[3] > lat_max:
+            return False
+    paths = paths or dataset_paths()
+    try:
+        return index["sources"] == source_fingerprint(paths)
+    except FileNotFoundError:
+        # Sources were removed, the store is all we have
+        return True
+
+def open_store(path=STORE_DIR):
+    """Open the store as an xarray Dataset backed by read-only memory maps (no copy)."""
+    index = load_index(path)
+    if index is None:
+        raise FileNotFoundError(f"No array store at {path}, run `python -m modules.store` first")
+    coords = dict(index["coords"])
+    coords[TIME_DIM] = np.array(coords[TIME_DIM], dtype="datetime64[ns]")
+    data_vars = {
+        name: (info["dims"], np.load(os.path.join(path, info["file"]), mmap_mode="r"), info["attrs"])
+        for name, info in index["variables"].items()
+    }
+    return xr.Dataset(data_vars, coords=coords)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert the NetCDF dataset into the memory-mapped array store.")
+    parser.add_argument("paths", nargs="*", help="NetCDF files (default: the map dataset files)")
+    parser.add_argument("--output", default=STORE_DIR, help="Store directory")
+    parser.add_argument("--bbox", type=float, nargs=4, metavar=("LON_MIN", "LAT_MIN", "LON_MAX", "LAT_MAX"),
+                        default=DEFAULT_BBOX, help="Region to keep")
+    parser.add_argument("--chunk-size", type=int, default=24, help="Time steps converted per pass")
+    args = parser.parse_args(argv)
+
+    index = ingest(args.paths or None, output=args.output, bbox=tuple(args.bbox), chunk_size=args.chunk_size)
+    shape = [len(index["coords"][dim]) for dim in (TIME_DIM, "latitude", "longitude")]
+    print(f"Wrote {', '.join(index['variables'])} {shape} to {args.output}")
+
+if __name__ == "__main__":
+    main()
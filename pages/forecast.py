@@ -1,67 +1,76 @@
-import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
+import streamlit as st
 
 # Import the helper functions from the modules folder
-from modules.helper import get_weather_forecast, get_location
+from modules.helper import get_weather_forecast, get_location, forecast_params, FORECAST_URL
 from modules.cache import cache_manager
+from modules.forecast import forecast_figure, forecast_frames, payload_hash
+from modules.dataset import load_data
+from modules.points import load_point_index, local_data_available, query_point
+
+# Both views are keyed by the payload hash only: Streamlit skips hashing "_" arguments
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_forecast_frames(key, _weather_data):
+    return forecast_frames(_weather_data)
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def load_forecast_figure(key, _weather_data):
+    # Shared across sessions, never modified after it is built
+    return forecast_figure(*load_forecast_frames(key, _weather_data))
+
+def render_local_history(latitude, longitude):
+    """Time series of the local map dataset at the location, read without any network call."""
+    if not local_data_available():
+        return
+    index = load_point_index()
+    if not index.contains(np.array([latitude]), np.array([longitude]))[0]:
+        return
+    with st.expander("Dataset history at this location"):
+        method = st.radio("Interpolation", ("nearest", "bilinear"), horizontal=True)
+        point = query_point(load_data(), index, latitude, longitude, method=method)
+        history = pd.DataFrame({
+            "Temperature (°C)": point.t2m.values - 273.15,
+            "Wind speed (m/s)": np.hypot(point.u10.values, point.v10.values),
+        }, index=pd.DatetimeIndex(point.valid_time.values, name="time"))
+        st.line_chart(history)
 
 def render():
     # Get the location from the user
     location = get_location()
 
     # Attempt to load weather data from cache
-    weather_data = cache_manager.load(location["latitude"], location["longitude"])
+    params = forecast_params(location["latitude"], location["longitude"])
+    weather_data = cache_manager.load("forecast", location["latitude"], location["longitude"], params=params)
     
     if not weather_data:
         # Get the weather forecast data
         weather_data = get_weather_forecast(location["latitude"], location["longitude"])
         # Save the fetched data to cache
-        cache_manager.save(weather_data, location["latitude"], location["longitude"])
+        if weather_data:
+            cache_manager.save(weather_data, "forecast", location["latitude"], location["longitude"],
+                               source=FORECAST_URL, params=params)
     
     # Button to clear cache
     if st.button("Clear Cache"):
-        cache_manager.clear_cache(location["latitude"], location["longitude"])
+        cache_manager.clear_cache("forecast", location["latitude"], location["longitude"])
         st.success("Cache cleared.")
 
     # Check if the weather data is available
     if weather_data:
-        # Extract the hourly data
-        hourly_data = weather_data["hourly"]
-
-        # Convert the hourly data to a DataFrame
-        hourly_df = pd.DataFrame(hourly_data)
-
-        # Display the hourly data
-        st.subheader("Hourly Weather Forecast")
-        st.write(hourly_df)
-
-        # Plot the hourly temperature data
-        fig = px.line(hourly_df, x="time", y="temperature_2m", title="Hourly Temperature Forecast")
-        st.plotly_chart(fig)
-
-        # Plot the hourly wind speed data
-        fig = px.line(hourly_df, x="time", y="windspeed_10m", title="Hourly Wind Speed Forecast")
-        st.plotly_chart(fig)
-
-        # Plot the hourly wind direction data
-        fig = px.line(hourly_df, x="time", y="winddirection_10m", title="Hourly Wind Direction Forecast")
-        st.plotly_chart(fig)
-
-        # Extract the daily data
-        daily_data = weather_data["daily"]
-
-        # Convert the daily data to a DataFrame
-        daily_df = pd.DataFrame(daily_data)
+        key = payload_hash(weather_data)
+        hourly_df, daily_df = load_forecast_frames(key, weather_data)
 
-        # Display the daily data
-        st.subheader("Daily Weather Forecast")
-        st.write(daily_df)
+        # Every series on one shared time axis
+        st.subheader("Weather Forecast")
+        st.plotly_chart(load_forecast_figure(key, weather_data), use_container_width=True)
 
-        # Plot the daily temperature data
-        fig = px.bar(daily_df, x="time", y=["temperature_2m_max", "temperature_2m_min"], barmode="group", title="Daily Temperature Forecast")
-        st.plotly_chart(fig)
+        hourly_tab, daily_tab = st.tabs(["Hourly", "Daily"])
+        with hourly_tab:
+            st.dataframe(hourly_df, use_container_width=True, height=300,
+                         column_config={name: st.column_config.NumberColumn(format="%.1f") for name in hourly_df})
+        with daily_tab:
+            st.dataframe(daily_df, use_container_width=True,
+                         column_config={name: st.column_config.NumberColumn(format="%.1f") for name in daily_df})
 
-        # Plot the daily wind speed data
-        fig = px.bar(daily_df, x="time", y="windspeed_10m_max", title="Daily Wind Speed Forecast")
-        st.plotly_chart(fig)
\ No newline at end of file
+    render_local_history(location["latitude"], location["longitude"])
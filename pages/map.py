@@ -1,19 +1,20 @@
 import streamlit as st
-import xarray as xr
-import numpy as np
-import imageio
-import io
-import time
 
 import plotly.graph_objects as go
 
-@st.cache_resource
-def load_data():
-    # Load the weather data
-    data = xr.open_dataset('./dataset/data_stream-oper_stepType-instant.nc')
-    return data
+from modules.dataset import load_data
+from modules.derived import load_derived_fields
+from modules.lod import LodPyramid, lod_level
+from modules.perf import perf
 
-import plotly.graph_objects as go
+# Width and height of the square map figure, in pixels
+FIGURE_SIZE = 600
+
+@st.cache_resource
+def load_lod_pyramid():
+    # Coarsened contour fields, cached per variable and time for the whole process
+    data = load_data()
+    return LodPyramid(load_derived_fields(), data.latitude.values, data.longitude.values)
 
 def load_basemap(fig,
                         llcrnrlon=90,
@@ -79,57 +80,47 @@ def load_basemap(fig,
 
     return fig
 
-def create_plotly_figure(variable, lat, lon, data, time_index=0):
+# Colorbar unit and title label per variable
+VARIABLE_LABELS = {
+    "Temperature": ("°C", "Temperature (°C)"),
+    "Wind": ("m/s", "Wind Speed (m/s)"),
+}
+
+@perf.timed("plotly.figure")
+def create_plotly_figure(variable, lat, lon, derived, time_index=0, zrange=None, pyramid=None, level=0):
     """
     Create a single Plotly figure given a variable (Temperature or Wind),
-    lat, lon arrays, and a time index.
+    lat, lon arrays, the precomputed DerivedFields and a time index.
+    zrange fixes the colorbar limits; with a LodPyramid, level > 0 plots a
+    coarsened field instead of the full resolution one.
     """
-    if variable == "Temperature":
-        # Temperature array: subtract 273.15 to convert from K to °C
-        t2m = data.t2m[time_index, :, :].values - 273.15
-        fig = go.Figure(
-            data=go.Contour(
-                z=t2m,
-                x=lon.values,
-                y=lat.values,
-                colorscale='Jet',
-                contours=dict(showlabels=False),
-                colorbar=dict(title="°C")
-            )
-        )
-        fig = load_basemap(fig,
-                   llcrnrlon=90, llcrnrlat=-10,
-                   urcrnrlon=140, urcrnrlat=30,
-                   projection="mercator")
-        fig.update_layout(
-            title=f"Temperature (°C) at time index {time_index}",
-            xaxis_title="Longitude",
-            yaxis_title="Latitude"
-        )
-    else:  # "Wind"
-        # Compute wind speed magnitude
-        wind_u = data.u10[time_index, :, :].values
-        wind_v = data.v10[time_index, :, :].values
-        WS = np.sqrt(wind_u**2 + wind_v**2)
-        fig = go.Figure(
-            data=go.Contour(
-                z=WS,
-                x=lon.values,
-                y=lat.values,
-                colorscale='Jet',
-                contours=dict(showlabels=False),
-                colorbar=dict(title="m/s")
-            )
-        )
-        fig = load_basemap(fig,
-                   llcrnrlon=90, llcrnrlat=-10,
-                   urcrnrlon=140, urcrnrlat=30,
-                   projection="mercator")
-        fig.update_layout(
-            title=f"Wind Speed (m/s) at time index {time_index}",
-            xaxis_title="Longitude",
-            yaxis_title="Latitude"
-        )
+    unit, label = VARIABLE_LABELS[variable]
+    if pyramid is not None and level > 0:
+        z = pyramid.field(variable, time_index, level)
+        y, x = pyramid.coords(level)
+    else:
+        z = derived.field(variable, time_index)
+        y, x = lat.values, lon.values
+    contour = go.Contour(
+        z=z,
+        x=x,
+        y=y,
+        colorscale='Jet',
+        contours=dict(showlabels=False),
+        colorbar=dict(title=unit)
+    )
+    if zrange is not None:
+        contour.update(zauto=False, zmin=zrange[0], zmax=zrange[1])
+    fig = go.Figure(data=contour)
+    fig = load_basemap(fig,
+               llcrnrlon=90, llcrnrlat=-10,
+               urcrnrlon=140, urcrnrlat=30,
+               projection="mercator")
+    fig.update_layout(
+        title=f"{label} at time index {time_index}",
+        xaxis_title="Longitude",
+        yaxis_title="Latitude"
+    )
 
     # Restrict the axes range to approximate your previous Basemap region
     fig.update_xaxes(range=[90, 140])
@@ -137,8 +128,8 @@ def create_plotly_figure(variable, lat, lon, data, time_index=0):
 
     # Enforce 1:1 aspect ratio and make the figure square
     fig.update_layout(
-        width=600,
-        height=600,
+        width=FIGURE_SIZE,
+        height=FIGURE_SIZE,
         margin=dict(l=20, r=20, t=40, b=20)
     )
     fig.update_yaxes(
@@ -148,6 +139,59 @@ def create_plotly_figure(variable, lat, lon, data, time_index=0):
 
     return fig
 
+@perf.timed("plotly.animation")
+def create_animated_figure(variable, lat, lon, derived, fps=2, pyramid=None, level=0):
+    """
+    Build one figure holding every time step as a go.Frame, with play/pause buttons
+    and a time slider. Frames only carry the z array and the title, so the layout
+    and coordinates are sent once and playback runs entirely in the browser.
+    """
+    _, label = VARIABLE_LABELS[variable]
+    num_times = derived.num_times
+
+    # One colorbar range for the whole animation, so colors are comparable across frames
+    fig = create_plotly_figure(variable, lat, lon, derived, 0, zrange=derived.zrange(variable),
+                               pyramid=pyramid, level=level)
+    if pyramid is not None and level > 0:
+        frames = (pyramid.field(variable, i, level) for i in range(num_times))
+    else:
+        frames = derived.frames(variable)
+    fig.frames = [
+        go.Frame(
+            data=[go.Contour(z=z)],
+            traces=[0],
+            name=str(i),
+            layout=dict(title=f"{label} at time index {i}"),
+        )
+        for i, z in enumerate(frames)
+    ]
+
+    frame_duration = int(1000 / fps)
+    play_args = dict(frame=dict(duration=frame_duration, redraw=True), transition=dict(duration=0), fromcurrent=True)
+    fig.update_layout(
+        height=700,
+        updatemenus=[dict(
+            type="buttons",
+            direction="left",
+            x=0, y=-0.02, xanchor="left", yanchor="top",
+            buttons=[
+                dict(label="Play", method="animate", args=[None, play_args]),
+                dict(label="Pause", method="animate",
+                     args=[[None], dict(frame=dict(duration=0, redraw=False), mode="immediate")]),
+            ],
+        )],
+        sliders=[dict(
+            x=0.15, y=-0.02, len=0.85, xanchor="left", yanchor="top",
+            currentvalue=dict(prefix="Time index: "),
+            steps=[
+                dict(label=str(i), method="animate",
+                     args=[[str(i)], dict(frame=dict(duration=0, redraw=True), mode="immediate")])
+                for i in range(num_times)
+            ],
+        )],
+    )
+    return fig
+
 def render():
     st.title("Weather Data Heatmap (Plotly)")
 
@@ -166,9 +210,7 @@ def render():
 
     with st.spinner("Loading data..."):
         data = load_data()
-
-    if "stop_animation" not in st.session_state:
-        st.session_state.stop_animation = False
+        derived = load_derived_fields()
 
     # Create a UI layout with columns for better organization
     col1, col2 = st.columns(2)
@@ -178,33 +220,31 @@ def render():
         variable = st.selectbox("Select variable", ("Temperature", "Wind"))
 
     with col2:
-        fps = st.slider("Animation FPS", 1, 10, 2, help="Frames per second for both real-time animation and GIF.")
+        fps = st.slider("Animation FPS", 1, 10, 2, help="Frames per second of the animation playback.")
+        full_resolution = st.checkbox(
+            "Full resolution",
+            help="Send every grid cell. By default the field is averaged down to what the figure can show.",
+        )
 
     st.write("### Controls")
-    animate = st.button("Animate")
-    stop = st.button("Stop Animation")
-
-    if stop:
-        st.session_state.stop_animation = True
+    animate = st.toggle("Animate", help="Send every time step once and play it back in the browser.")
 
     lat = data.latitude
     lon = data.longitude
 
-    # Show static or interactive animation in the Streamlit loop
-    if animate:
-        st.session_state.stop_animation = False
-        placeholder = st.empty()
-
-        for i in range(data.valid_time.size):
-            if st.session_state.stop_animation:
-                break
-            fig = create_plotly_figure(variable, lat, lon, data, i)
-            placeholder.plotly_chart(fig, use_container_width=True)
+    pyramid = load_lod_pyramid()
+    level = 0 if full_resolution else lod_level((lat.size, lon.size), FIGURE_SIZE, FIGURE_SIZE)
 
-            # Sleep for 1/fps seconds to simulate frame rate
-            time.sleep(1.0 / fps)
+    if animate:
+        # Playback, pausing and scrubbing happen client-side via the figure's own controls
+        fig = create_animated_figure(variable, lat, lon, derived, fps, pyramid=pyramid, level=level)
+        # Figure serialization to the browser, measured apart from building it
+        with perf.span("plotly.serialize", animated=True):
+            st.plotly_chart(fig, use_container_width=True)
 
     else:
         # If not animating, show static plot for the selected time_index
-        fig = create_plotly_figure(variable, lat, lon, data, time_index)
-        st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+        fig = create_plotly_figure(variable, lat, lon, derived, time_index, zrange=derived.zrange(variable),
+                                   pyramid=pyramid, level=level)
+        with perf.span("plotly.serialize", animated=False):
+            st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
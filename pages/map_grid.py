@@ -0,0 +1,47 @@
+import streamlit as st
+import streamlit.components.v1 as components
+
+from modules.gridmap import GRID_VARIABLES, LAYERS, grid_map_html
+from modules.helper import (
+    fetch_weather_data_for_grid_cached, fetch_weather_grid_sparse_cached, get_location_and_grid, load_user_config,
+)
+from modules.perf import perf
+
+MAP_HEIGHT = 600
+
+def render():
+    st.title("Weather Grid Map")
+
+    grid_points = get_location_and_grid()
+    sparse = st.sidebar.checkbox("Sparse fetch", help="Fetch a coarse lattice of points and interpolate the rest.")
+    if sparse:
+        control_points = st.sidebar.slider("Control points per axis", 2, 10, 5)
+        config = load_user_config()
+        grid, holdout = fetch_weather_grid_sparse_cached(config["latitude"], config["longitude"],
+                                                         config["radius_km"], int(config["num_points"]), control_points)
+    else:
+        grid = fetch_weather_data_for_grid_cached(grid_points)
+
+    if grid.time.size == 0:
+        st.warning("No grid data could be fetched.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        variable = st.selectbox("Select variable", list(GRID_VARIABLES), format_func=GRID_VARIABLES.get)
+    with col2:
+        layer = st.radio("Layer", LAYERS, horizontal=True)
+    with col3:
+        fps = st.slider("Animation FPS", 1, 10, 4, help="Frames per second of the animation playback.")
+
+    # Sent once per change of the controls above; the time slider inside runs in the browser
+    with perf.span("gridmap.html", layer=layer):
+        html = grid_map_html(grid, variable, layer, fps, height=MAP_HEIGHT)
+    components.html(html, height=MAP_HEIGHT + 50)
+    st.caption(f"{grid.latitude.size} x {grid.longitude.size} cells, {grid.time.size} hours.")
+
+    if sparse:
+        with st.expander("Interpolation error at held-out points"):
+            st.dataframe(holdout.groupby("variable")[["mae", "rmse", "max_error"]].mean(),
+                         column_config={name: st.column_config.NumberColumn(format="%.2f")
+                                        for name in ("mae", "rmse", "max_error")})
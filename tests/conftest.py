@@ -0,0 +1,22 @@
+import os
+import sys
+
+# Modules are imported from the repository root, like `streamlit run app.py` does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Read by modules.perf on import: no performance log from test runs
+os.environ.setdefault("WEATHER_PERF_LOG", "")
+
+import pytest
+
+@pytest.fixture
+def cache(tmp_path):
+    from modules.cache import CacheManager
+    return CacheManager(cache_dir=str(tmp_path / "cache"), backend="sqlite")
+
+@pytest.fixture
+def engine():
+    from modules.fetch import FetchEngine
+    # No retries: every mock failure is final, and the tests stay fast
+    engine = FetchEngine(retries=0)
+    yield engine
+    engine.close()
@@ -0,0 +1,111 @@
+import pytest
+from aiohttp import web
+
+from benchmarks.mock_server import MockOpenMeteo, archive_payload
+from modules import archive
+from modules.archive import (
+    ArchiveRequest, archive_batches, archive_params, archive_window, fetch_archive_batch, fetch_archive_cells,
+    valid_archive_data,
+)
+
+CELLS = [(21.0, 105.75), (21.0, 106.0), (21.25, 105.75), (21.25, 106.0), (21.5, 105.75)]
+
+class FaultyArchive(MockOpenMeteo):
+    """
+    Mock archive whose multi-location requests fail with a 400 ("error") or answer
+    one result short ("short"). Single-location requests are served normally.
+    """
+    def __init__(self, batch_fault=None, **kwargs):
+        super().__init__(latency=0, **kwargs)
+        self.batch_fault = batch_fault
+
+    async def _archive(self, request):
+        query = request.query
+        lats, lons = query["latitude"].split(","), query["longitude"].split(",")
+        self.stats["batch_requests" if len(lats) > 1 else "single_requests"] += 1
+        if len(lats) > 1 and self.batch_fault == "error":
+            self.stats["requests"] += 1
+            return web.json_response({"error": True, "reason": "mock failure"}, status=400)
+        if len(lats) > 1 and self.batch_fault == "short":
+            self.stats["requests"] += 1
+            return web.json_response([
+                archive_payload(float(lat), float(lon), query["start_date"], query["end_date"])
+                for lat, lon in zip(lats[:-1], lons[:-1])
+            ])
+        return await super()._archive(request)
+
+@pytest.fixture
+def server(request, monkeypatch):
+    server = FaultyArchive(getattr(request, "param", None)).start()
+    monkeypatch.setattr(archive, "ARCHIVE_URL", server.archive_url)
+    yield server
+    server.stop()
+
+def fetch_batch(engine, cells):
+    params_list = [archive_params(*cell) for cell in cells]
+    return engine.run(fetch_archive_batch(params_list, engine=engine))
+
+def test_batch_is_one_request_with_one_result_per_point(server, engine):
+    results = fetch_batch(engine, CELLS[:3])
+    assert server.stats["batch_requests"] == 1
+    assert server.stats["single_requests"] == 0
+    assert [(r["latitude"], r["longitude"]) for r in results] == CELLS[:3]
+    assert all(valid_archive_data(r) for r in results)
+
+@pytest.mark.parametrize("server", ["short", "error"], indirect=True)
+def test_failed_batch_falls_back_to_single_points(server, engine):
+    results = fetch_batch(engine, CELLS[:3])
+    assert server.stats["batch_requests"] == 1
+    assert server.stats["single_requests"] == 3
+    assert [(r["latitude"], r["longitude"]) for r in results] == CELLS[:3]
+
+def test_fetch_archive_cells_splits_batches(server, engine, cache):
+    data = fetch_archive_cells(CELLS, batch_size=2, engine=engine, cache=cache)
+    assert set(data) == set(CELLS)
+    # 5 cells, 2 per batch: 2 batches of 2 points and a single-point request
+    assert server.stats["batch_requests"] == 2
+    assert server.stats["single_requests"] == 1
+
+    # Everything is cached now
+    progress = []
+    again = fetch_archive_cells(CELLS, batch_size=2, engine=engine, cache=cache,
+                                on_progress=lambda done, total: progress.append((done, total)))
+    assert again == data
+    assert server.stats["requests"] == 3
+    assert progress == [(5, 5)]
+
+def test_fetch_archive_cells_reports_failed_cells(server, engine, cache, monkeypatch):
+    # Neither the batch nor the single-point requests get an answer
+    monkeypatch.setattr(archive, "ARCHIVE_URL", server.archive_url.replace("/era5", "/missing"))
+    errors = []
+    data = fetch_archive_cells(CELLS[:2], engine=engine, cache=cache,
+                               on_error=lambda cell, message: errors.append(cell))
+    assert data == {}
+    assert errors == CELLS[:2]
+
+def test_archive_batches_groups_by_window():
+    window = archive_window()
+    other = ["2024-01-01", "2024-01-07"]
+    requests = [
+        ArchiveRequest(cell, archive_params(*cell), archive_params(*cell, window=other if i % 2 else window))
+        for i, cell in enumerate(CELLS)
+    ]
+    batches = archive_batches(requests, batch_size=2)
+    assert sorted(len(batch) for batch in batches) == [1, 2, 2]
+    for batch in batches:
+        assert len({(r.fetch_params["start_date"], r.fetch_params["end_date"]) for r in batch}) == 1
+
+def test_outdated_archive_entries_are_counted_stale(server, engine, cache):
+    window = archive_window()
+    older = [(archive.datetime.date.fromisoformat(d) - archive.datetime.timedelta(days=2)).isoformat()
+             for d in window]
+    # Same series two days behind, and a series of other variables
+    cache.save(archive_payload(*CELLS[0], *older), "archive", *CELLS[0],
+               params=archive_params(*CELLS[0], window=older), time_range=older)
+    cache.save(archive_payload(*CELLS[1], *window), "archive", *CELLS[1],
+               params=dict(archive_params(*CELLS[1], window=window), hourly="temperature_2m"), time_range=window)
+    data = fetch_archive_cells(CELLS[:2], engine=engine, cache=cache)
+    assert set(data) == set(CELLS[:2])
+    assert cache.stats["expired"] == 1
+    assert cache.stats["params_mismatch"] == 1
+    assert cache.get_stats()["hit_ratio"] == 0.0
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from modules import cache as cache_module
+from modules.cache import CacheManager
+
+PARAMS = {"latitude": 21.0, "longitude": 105.75, "hourly": "temperature_2m"}
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request):
+    return request.param
+
+def test_round_trip_through_both_tiers(tmp_path, backend):
+    cache = CacheManager(cache_dir=str(tmp_path), backend=backend)
+    cache.save({"value": 1}, "forecast", 21.0, 105.75, params=PARAMS)
+    assert cache.load("forecast", 21.0, 105.75, params=PARAMS) == {"value": 1}
+    assert cache.stats["memory_hits"] == 1
+    # A new manager only has the disk tier
+    cold = CacheManager(cache_dir=str(tmp_path), backend=backend)
+    assert cold.load("forecast", 21.0, 105.75, params=PARAMS) == {"value": 1}
+    assert cold.stats["disk_hits"] == 1
+
+def test_expired_entry_is_a_miss(tmp_path, backend, monkeypatch):
+    cache = CacheManager(cache_dir=str(tmp_path), backend=backend, namespaces={"forecast": 60, "config": None})
+    cache.save({"value": 1}, "forecast", "key")
+    cache.save({"value": 2}, "config", "key")
+    later = time.time() + 61
+    monkeypatch.setattr(cache_module.time, "time", lambda: later)
+    assert cache.load("forecast", "key") is None
+    assert cache.stats["expired"] == 1
+    # Namespaces without a TTL never expire
+    assert cache.load("config", "key") == {"value": 2}
+    # The raw entry is still there, e.g. to extend a cached series
+    assert cache.load_entry("forecast", "key").data == {"value": 1}
+
+def test_params_mismatch_is_a_miss(tmp_path, backend):
+    cache = CacheManager(cache_dir=str(tmp_path), backend=backend)
+    cache.save({"value": 1}, "forecast", "key", params=PARAMS)
+    other = dict(PARAMS, hourly="temperature_2m,windspeed_10m")
+    assert cache.load("forecast", "key", params=other) is None
+    assert cache.stats["params_mismatch"] == 1
+    # Key order does not change the hash
+    assert cache.load("forecast", "key", params=dict(reversed(list(PARAMS.items())))) == {"value": 1}
+
+def test_series_hash_ignores_the_date_window(tmp_path):
+    cache = CacheManager(cache_dir=str(tmp_path), backend="sqlite")
+    window = {"start_date": "2024-01-01", "end_date": "2024-01-07"}
+    entry = cache.save({}, "archive", "key", params={**PARAMS, **window}, time_range=["2024-01-01", "2024-01-07"])
+    moved = {"start_date": "2024-01-03", "end_date": "2024-01-09"}
+    assert entry.params_hash != cache_module.params_hash({**PARAMS, **moved})
+    assert entry.series_hash == cache_module.series_params_hash({**PARAMS, **moved})
+    assert entry.series_hash != cache_module.series_params_hash({**PARAMS, **moved, "hourly": "windspeed_10m"})
+
+def test_disk_eviction_drops_least_recently_used(tmp_path, backend, monkeypatch):
+    cache = CacheManager(cache_dir=str(tmp_path), backend=backend, disk_max_entries=3)
+    clock = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: clock[0])
+    for key in ("a", "b", "c"):
+        clock[0] += 1
+        cache.save({"key": key}, "archive", key)
+    clock[0] += 1
+    cache.load("archive", "a")
+    clock[0] += 1
+    cache.save({"key": "d"}, "archive", "d")
+
+    assert cache.stats["disk_evictions"] == 1
+    assert sorted(cache.backend.keys("archive")) == ["a", "c", "d"]
+    assert cache.load("archive", "b") is None
+
+def test_disk_eviction_keeps_namespaces_without_ttl(tmp_path, backend):
+    cache = CacheManager(cache_dir=str(tmp_path), backend=backend, disk_max_entries=2)
+    cache.save({"user": 1}, "config", "user_config")
+    for key in ("a", "b", "c"):
+        cache.save({"key": key}, "archive", key)
+    assert cache.backend.keys("config") == ["user_config"]
+    assert len(cache.backend.keys("archive")) == 1
+
+def test_unknown_namespace(tmp_path):
+    cache = CacheManager(cache_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        cache.load("nope", "key")
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+
+from benchmarks.mock_server import MockOpenMeteo
+from modules.fetch import FetchEngine
+
+class ScriptedForecast(MockOpenMeteo):
+    """
+    Mock forecast endpoint answering with a scripted sequence of (status, headers),
+    then normally. "invalid" answers a 200 with a body that is not JSON. The request
+    times and the peak number of concurrent requests are recorded.
+    """
+    def __init__(self, script=(), latency=0, **kwargs):
+        super().__init__(latency=latency, **kwargs)
+        self.script = list(script)
+        self.times = []
+        self.active = 0
+        self.peak = 0
+
+    async def _forecast(self, request):
+        self.times.append(time.perf_counter())
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            if self.script:
+                status, headers = self.script.pop(0)
+                self.stats["requests"] += 1
+                if status == "invalid":
+                    return web.Response(text="<html>not json</html>", content_type="application/json")
+                return web.json_response({"error": True, "reason": "scripted"}, status=status, headers=headers)
+            return await super()._forecast(request)
+        finally:
+            self.active -= 1
+
+@pytest.fixture
+def server(request):
+    server = ScriptedForecast(**getattr(request, "param", {})).start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def retrying_engine():
+    # Tiny backoff: the delays seen by the server come from Retry-After
+    engine = FetchEngine(retries=2, backoff=0.001, max_backoff=5)
+    yield engine
+    engine.close()
+
+def params(lat=21.0, lon=105.75):
+    return {"latitude": lat, "longitude": lon}
+
+def fetch_all(engine, url, params_list):
+    async def gather():
+        return await asyncio.gather(*(engine.get_json_async(url, p) for p in params_list))
+    return engine.run(gather())
+
+@pytest.mark.parametrize("server", [{"latency": 0.2}], indirect=True)
+def test_identical_concurrent_requests_share_one_call(server, engine):
+    results = fetch_all(engine, server.forecast_url, [params()] * 10)
+    assert server.stats["requests"] == 1
+    assert all(result == results[0] for result in results)
+    assert results[0]["latitude"] == 21.0
+    # Once done, the same request goes out again
+    assert engine.get_json(server.forecast_url, params()) == results[0]
+    assert server.stats["requests"] == 2
+
+@pytest.mark.parametrize("server", [{"script": [(503, None)]}], indirect=True)
+def test_server_error_is_retried(server, retrying_engine):
+    result = retrying_engine.get_json(server.forecast_url, params())
+    assert result["latitude"] == 21.0
+    assert server.stats["requests"] == 2
+
+@pytest.mark.parametrize("server", [{"script": [(429, {"Retry-After": "0.4"})]}], indirect=True)
+def test_rate_limit_waits_for_retry_after(server, retrying_engine):
+    result = retrying_engine.get_json(server.forecast_url, params())
+    assert result is not None
+    assert len(server.times) == 2
+    assert server.times[1] - server.times[0] >= 0.4
+
+@pytest.mark.parametrize("server", [{"script": [(503, None)] * 3}], indirect=True)
+def test_gives_up_after_the_retries(server, retrying_engine):
+    assert retrying_engine.get_json(server.forecast_url, params()) is None
+    assert server.stats["requests"] == 3
+
+@pytest.mark.parametrize("server", [{"script": [(400, None)]}, {"script": [("invalid", None)]}], indirect=True)
+def test_client_error_and_invalid_json_are_not_retried(server, retrying_engine):
+    assert retrying_engine.get_json(server.forecast_url, params()) is None
+    assert server.stats["requests"] == 1
+
+@pytest.mark.parametrize("server", [{"latency": 0.1}], indirect=True)
+def test_in_flight_requests_are_limited(server):
+    engine = FetchEngine(max_in_flight=2, retries=0)
+    try:
+        results = fetch_all(engine, server.forecast_url, [params(lat=lat) for lat in range(6)])
+    finally:
+        engine.close()
+    assert [result["latitude"] for result in results] == list(range(6))
+    assert server.stats["requests"] == 6
+    assert server.peak == 2
@@ -0,0 +1,30 @@
+import numpy as np
+
+from modules.grid import ERA5_RESOLUTION, grid_points_array, snap_grid
+
+def test_snap_grid_deduplicates_points_of_one_cell():
+    points = [(21.02, 105.85), (21.07, 105.80), (21.30, 105.85), (20.99, 105.88)]
+    grid = snap_grid(points)
+    assert grid.cell_keys() == [(21.0, 105.75), (21.0, 106.0), (21.25, 105.75)]
+    assert grid.point_keys() == [(21.0, 105.75), (21.0, 105.75), (21.25, 105.75), (21.0, 106.0)]
+
+def test_snap_grid_keys_are_exact():
+    # Floating point noise must not split a cell in two
+    grid = snap_grid([(0.1 + 0.2, 0.0), (0.3, 0.0), (-0.1, 0.4)])
+    assert grid.cell_keys() == [(0.0, 0.5), (0.25, 0.0)]
+    assert all(isinstance(value, float) for key in grid.cell_keys() for value in key)
+
+def test_snap_grid_broadcast():
+    grid = snap_grid(grid_points_array(21.0285, 105.8542, 1.0, 5))
+    # A 1 km grid falls inside one ERA5 cell
+    assert len(grid.cells) == 1
+    assert len(grid.points) == 25
+    assert grid.broadcast({grid.cell_keys()[0]: "data"}) == ["data"] * 25
+    assert grid.broadcast(np.array([7.0])).tolist() == [7.0] * 25
+
+def test_snap_grid_cells_on_resolution():
+    grid = snap_grid(grid_points_array(16.0, 106.0, 100, 10), resolution=ERA5_RESOLUTION)
+    assert np.allclose(grid.cells / ERA5_RESOLUTION, np.round(grid.cells / ERA5_RESOLUTION))
+    assert len(grid.cells) == len({tuple(cell) for cell in grid.cells.tolist()})
+    assert grid.index.shape == (100,)
+    assert np.abs(grid.cells[grid.index] - grid.points).max() <= ERA5_RESOLUTION / 2 + 1e-9
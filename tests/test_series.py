@@ -0,0 +1,51 @@
+from benchmarks.mock_server import archive_payload
+from modules.series import merge_series, missing_window, series_time_range
+
+WINDOW = ["2024-01-03", "2024-01-09"]
+
+def test_missing_window_nothing_cached():
+    assert missing_window(None, WINDOW) == WINDOW
+
+def test_missing_window_fully_covered():
+    assert missing_window(["2024-01-01", "2024-01-09"], WINDOW) is None
+
+def test_missing_window_new_days_only():
+    # The window moved two days since the series was stored
+    assert missing_window(["2024-01-01", "2024-01-07"], WINDOW) == ["2024-01-08", "2024-01-09"]
+    assert missing_window(["2024-01-05", "2024-01-12"], WINDOW) == ["2024-01-03", "2024-01-04"]
+
+def test_missing_window_gap_on_both_sides():
+    # One request for both ends: the smallest window containing every missing day
+    assert missing_window(["2024-01-05", "2024-01-06"], WINDOW) == WINDOW
+
+def test_missing_window_no_overlap():
+    assert missing_window(["2023-12-01", "2023-12-07"], WINDOW) == WINDOW
+
+def test_merge_series_extends_and_trims():
+    old = archive_payload(21.0, 105.75, "2024-01-01", "2024-01-07")
+    new = archive_payload(21.0, 105.75, "2024-01-08", "2024-01-09")
+    merged = merge_series(old, new, WINDOW)
+    times = merged["hourly"]["time"]
+    assert times[0] == "2024-01-03T00:00" and times[-1] == "2024-01-09T23:00"
+    assert len(times) == len(set(times)) == 7 * 24
+    assert all(len(values) == len(times) for values in merged["hourly"].values())
+    assert merged["daily"]["time"] == [f"2024-01-0{d}" for d in range(3, 10)]
+    assert series_time_range(merged) == WINDOW
+
+def test_merge_series_new_values_win():
+    old = archive_payload(21.0, 105.75, "2024-01-03", "2024-01-09")
+    new = archive_payload(21.0, 105.75, "2024-01-09", "2024-01-09")
+    new["hourly"]["temperature_2m"] = [99.0] * 24
+    merged = merge_series(old, new, WINDOW)
+    assert merged["hourly"]["temperature_2m"][-24:] == [99.0] * 24
+    assert merged["hourly"]["temperature_2m"][:-24] == old["hourly"]["temperature_2m"][:-24]
+
+def test_series_time_range_leaves_out_trailing_null_hours():
+    data = archive_payload(21.0, 105.75, "2024-01-03", "2024-01-09")
+    assert series_time_range(data) == WINDOW
+    # The last hours of the final day are not published yet
+    data["hourly"]["windspeed_10m"][-5:] = [None] * 5
+    assert series_time_range(data) == ["2024-01-03", "2024-01-08"]
+    assert missing_window(series_time_range(data), WINDOW) == ["2024-01-09", "2024-01-09"]
+    data["hourly"]["temperature_2m"] = [None] * len(data["hourly"]["time"])
+    assert series_time_range(data) is None